@@ -1,6 +1,5 @@
-from apc import hacks
-
 def main():
+  from apc import hacks
   hacks.seed_animals("emerald")
 
 if __name__ == "__main__":
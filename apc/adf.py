@@ -1,8 +1,11 @@
-import zlib, contextlib, random, math, struct
+import zlib, contextlib, random, math, struct, io, bisect, itertools, collections, mmap, os, tempfile, shutil
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from deca.file import ArchiveFile
-from deca.ff_adf import Adf
+from deca.ff_adf import Adf, adf_engine_lazy
 from pathlib import Path
 from apc import config
+from apc.utils import scatter_write
 from apc.adf_profile import *
 
 class FileNotFound(Exception):
@@ -15,28 +18,136 @@ class DecompressedAdfFile():
         self.file_header = file_header
         self.header = header
         self.data = data
-        self.org_size = len(header + data)
+        self.org_size = len(header) + len(data)
+        self.dirty = []
+
+    def write(self, offset: int, value: bytes) -> None:
+        self.data[offset:offset+len(value)] = value
+        self.dirty.append((offset, offset+len(value)))
+
+    def write_many(self, offsets: np.ndarray, values: np.ndarray, dtype: str) -> None:
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if len(offsets) == 0:
+            return
+        scatter_write(self.data, offsets, values, dtype)
+        self.dirty.append((offsets, offsets + np.dtype(dtype).itemsize))
+
+    def splice(self, splices: List[Tuple[int, int, bytes]]) -> None:
+        if len(splices) == 0:
+            return
+        self.data = _splice(self.data, splices)
+        self.dirty.append((min(x[0] for x in splices), len(self.data)))
+
+    def dirty_ranges(self, since: int = 0) -> List[Tuple[int, int]]:
+        """Sorted, merged (start, end) ranges of data changed since the file was loaded or saved, or since the first `since` changes"""
+        dirty = self.dirty[since:]
+        if len(dirty) == 0:
+            return []
+        starts = np.concatenate([np.atleast_1d(start) for start, _end in dirty]).astype(np.int64)
+        ends = np.concatenate([np.atleast_1d(end) for _start, end in dirty]).astype(np.int64)
+        order = np.argsort(starts, kind="stable")
+        starts = starts[order]
+        ends = np.maximum.accumulate(ends[order])
+        range_starts = np.flatnonzero(np.concatenate(([True], starts[1:] > ends[:-1])))
+        range_ends = np.concatenate((range_starts[1:] - 1, [len(starts) - 1]))
+        return list(zip(starts[range_starts].tolist(), ends[range_ends].tolist()))
+
+    def copy(self) -> "DecompressedAdfFile":
+        return DecompressedAdfFile(
+            self.basename,
+            self.filename,
+            bytearray(self.file_header),
+            bytearray(self.header),
+            bytearray(self.data)
+        )
 
     def save(self, destination: Path, verbose = False) -> None:        
-        decompressed_data_bytes = self.header + self.data
-        new_size = len(decompressed_data_bytes)
+        new_size = len(self.header) + len(self.data)
         if self.org_size != new_size:
           print("Org:", self.org_size, "New:", new_size)
           decompressed_size = struct.pack("I", new_size)
           self.file_header[8:12] = decompressed_size
           self.file_header[24:28] = decompressed_size
-        commpressed_data_bytes = self.file_header + _compress_bytes(decompressed_data_bytes)
 
         adf_file = destination / self.basename
-        if verbose:
-            print(f"Saving modded file to {adf_file}")
-        _save_file(adf_file, commpressed_data_bytes, verbose=verbose)  
+        if len(self.dirty) == 0 and self.filename.exists():
+            if adf_file.exists() and adf_file.samefile(self.filename):
+                if verbose:
+                    print(f"No changes to save to {adf_file}")
+                return
+            # nothing changed, so the loaded file is already compressed the way we would write it
+            if verbose:
+                print(f"Copying unchanged file to {adf_file}")
+            with self.filename.open("rb") as source:
+                _replace_file(adf_file, lambda f: shutil.copyfileobj(source, f))
+        else:
+            if verbose:
+                print(f"Saving modded file to {adf_file}")
+            _save_compressed_file(adf_file, self.file_header, [self.header, self.data], verbose=verbose)
+        # later saves compare against what was just written, not the file this was loaded from
+        self.filename = adf_file
+        self.org_size = new_size
+        self.dirty = []
+        _parsed_cache.put(adf_file, self.copy())
 
 class ParsedAdfFile():
     def __init__(self, decompressed: DecompressedAdfFile, adf: Adf) -> None:
         self.decompressed = decompressed
         self.adf = adf
 
+class ParsedAdfCache():
+    """LRU cache of loaded population files, keyed by path, size and modification time"""
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.entries = collections.OrderedDict()
+
+    @staticmethod
+    def _key(filename: Path) -> Tuple[int, int]:
+        stat = filename.stat()
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def get(self, filename: Path) -> ParsedAdfFile:
+        path = str(filename.resolve())
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        key, decompressed, adf, size = entry
+        if key != self._key(filename):
+            self.remove(filename)
+            return None
+        if adf is None:
+            adf = _parse_adf_bytes(decompressed.data, f"{decompressed.basename}_sliced")
+            self.entries[path] = (key, decompressed, adf, size)
+        self.entries.move_to_end(path)
+        # callers modify the data in place, so they get their own copy of it
+        return ParsedAdfFile(decompressed.copy(), adf)
+
+    def put(self, filename: Path, decompressed: DecompressedAdfFile, adf: Adf = None) -> None:
+        self.remove(filename)
+        size = 2 * len(decompressed.data)
+        if size > self.max_bytes:
+            return
+        self.entries[str(filename.resolve())] = (self._key(filename), decompressed, adf, size)
+        self.used_bytes += size
+        while self.used_bytes > self.max_bytes:
+            _path, (_key, _decompressed, _adf, evicted_size) = self.entries.popitem(last=False)
+            self.used_bytes -= evicted_size
+
+    def remove(self, filename: Path) -> None:
+        entry = self.entries.pop(str(filename.resolve()), None)
+        if entry is not None:
+            self.used_bytes -= entry[3]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.used_bytes = 0
+
+_parsed_cache = ParsedAdfCache(config.ADF_CACHE_SIZE)
+
+def clear_cache() -> None:
+    _parsed_cache.clear()
+
 def _get_file_name(reserve: str, mod: bool) -> Path:
     save_path = config.MOD_DIR_PATH if mod else config.get_save_path()
     if save_path is None:
@@ -51,17 +162,114 @@ def _read_file(filename: Path, verbose = False):
         print(f"Reading {filename}")
     return filename.read_bytes()
 
-def _decompress_bytes(data_bytes: bytearray) -> bytearray:
+def _decompress_bytes(data_bytes: bytearray, size: int = 0, chunk_size: int = 64 * 1024) -> bytearray:
+    # inflate a chunk of input at a time straight into one buffer of the expected size
     decompress = zlib.decompressobj()
-    decompressed = decompress.decompress(data_bytes)
-    decompressed = decompressed + decompress.flush()
+    decompressed = bytearray(size)
+    pos = 0
+    for start in range(0, len(data_bytes), chunk_size):
+        chunk = decompress.decompress(data_bytes[start:start+chunk_size])
+        decompressed[pos:pos+len(chunk)] = chunk
+        pos += len(chunk)
+    chunk = decompress.flush()
+    decompressed[pos:pos+len(chunk)] = chunk
+    pos += len(chunk)
+    del decompressed[pos:]
     return decompressed
 
-def _compress_bytes(data_bytes: bytearray) -> bytearray:
+PARALLEL_COMPRESS_MIN_SIZE = 4 * 1024 * 1024
+PARALLEL_COMPRESS_CHUNK_SIZE = 1024 * 1024
+ADLER_BASE = 65521
+
+def _compress_to_file(f, data: List[bytearray], chunk_size: int = 1024 * 1024, workers: int = None) -> None:
+    if workers != 1 and sum(len(x) for x in data) >= PARALLEL_COMPRESS_MIN_SIZE:
+        _compress_parallel_to_file(f, data, workers=workers)
+        return
     compress = zlib.compressobj()
-    compressed = compress.compress(data_bytes)
-    compressed = compressed + compress.flush()
-    return compressed
+    for data_bytes in data:
+        with memoryview(data_bytes) as view:
+            for start in range(0, len(view), chunk_size):
+                f.write(compress.compress(view[start:start+chunk_size]))
+    f.write(compress.flush())
+
+def _adler32_combine(adler1: int, adler2: int, length2: int) -> int:
+    # same as zlib's adler32_combine: the checksum of two buffers from the checksums of each
+    remainder = length2 % ADLER_BASE
+    sum1 = adler1 & 0xffff
+    sum2 = (remainder * sum1) % ADLER_BASE
+    sum1 = (sum1 + (adler2 & 0xffff) + ADLER_BASE - 1) % ADLER_BASE
+    sum2 = (sum2 + (adler1 >> 16) + (adler2 >> 16) + ADLER_BASE - remainder) % ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+def _deflate_chunk(chunk: memoryview, dictionary: memoryview, last: bool) -> Tuple[bytes, int]:
+    if dictionary is not None:
+        compress = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compress = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+    deflated = compress.compress(chunk) + compress.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return (deflated, zlib.adler32(chunk))
+
+def _compress_parallel_to_file(f, data: List[bytearray], chunk_size: int = PARALLEL_COMPRESS_CHUNK_SIZE, workers: int = None) -> None:
+    # deflate chunks on a thread pool, each primed with the 32 KB before it and ended with a sync
+    # flush so the raw blocks can be joined, then wrap them in a single zlib header and checksum
+    views = [memoryview(data_bytes) for data_bytes in data]
+    chunks = []
+    for view in views:
+        for start in range(0, len(view), chunk_size):
+            chunks.append((view[start:start+chunk_size], view[max(0, start-32768):start] if start > 0 else None))
+    if len(chunks) == 0:
+        chunks.append((memoryview(b""), None))
+    try:
+        f.write(zlib.compress(b"")[:2])
+        checksum = 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            last_chunks = [i == len(chunks) - 1 for i in range(len(chunks))]
+            deflated_chunks = executor.map(_deflate_chunk, [x[0] for x in chunks], [x[1] for x in chunks], last_chunks)
+            for (chunk, _dictionary), (deflated, chunk_checksum) in zip(chunks, deflated_chunks):
+                f.write(deflated)
+                checksum = _adler32_combine(checksum, chunk_checksum, len(chunk))
+        f.write(struct.pack(">I", checksum))
+    finally:
+        for chunk, dictionary in chunks:
+            chunk.release()
+            if dictionary is not None:
+                dictionary.release()
+        for view in views:
+            view.release()
+
+def _save_compressed_file(filename: Path, header: bytearray, data: List[bytearray], verbose = False) -> None:
+    def write(f) -> None:
+        f.write(header)
+        _compress_to_file(f, data)
+    _replace_file(filename, write)
+    if verbose:
+        print(f"Saved {filename}")
+
+def _replace_file(filename: Path, write: callable) -> None:
+    # write next to the target and swap it in, so a failed save never leaves a truncated file
+    Path(filename.parent).mkdir(exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=filename.parent, prefix=f"{filename.name}.", suffix=".tmp", delete=False) as f:
+        try:
+            write(f)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    try:
+        # temporary files are private, so keep the permissions the file had, or would have had when created
+        if filename.exists():
+            shutil.copymode(filename, f.name)
+        else:
+            os.chmod(f.name, 0o666 & ~_umask())
+        os.replace(f.name, filename)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+def _umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
 
 def _save_file(filename: Path, data_bytes: bytearray, verbose = False):
     Path(filename.parent).mkdir(exist_ok=True)
@@ -69,133 +277,148 @@ def _save_file(filename: Path, data_bytes: bytearray, verbose = False):
     if verbose:
         print(f"Saved {filename}")
 
-def _parse_adf_file(filename: Path, suffix: str = None, verbose = False) -> Adf:
+def _dump_adf(obj: Adf, name: str, suffix: str = None, verbose = False) -> None:
+    suffix = f"_{suffix}.txt" if suffix else ".txt"
+    txt_filename = config.WORKING_DIR_PATH / f"{name}{suffix}"
+    Path(txt_filename.parent).mkdir(exist_ok=True)
+    with txt_filename.open("w", encoding="utf-8") as f:
+        obj.dump_to(f)
+    if verbose:
+        print(f"Saved {txt_filename}")
+
+def _parse_adf_bytes(data: bytearray, name: str, suffix: str = None, verbose = False, engine: str = adf_engine_lazy, extract_values: bool = False, dump: bool = False) -> Adf:
     obj = Adf()
-    with ArchiveFile(open(filename, 'rb')) as f:
+    with ArchiveFile(io.BytesIO(data)) as f:
         with contextlib.redirect_stdout(None):
-            obj.deserialize(f)
-    content = obj.dump_to_string()
-    suffix = f"_{suffix}.txt" if suffix else ".txt"
-    txt_filename = config.APP_DIR_PATH / f".working/{filename.name}{suffix}"
-    _save_file(txt_filename, bytearray(content, 'utf-8'), verbose)            
+            obj.deserialize(f, engine=engine, extract_values=extract_values)
+    if dump:
+        _dump_adf(obj, name, suffix, verbose)
     return obj
 
-def _decompress_adf_file(filename: Path, verbose = False) -> DecompressedAdfFile:
-    # read entire adf file
-    data_bytes = _read_file(filename, verbose)
-    data_bytes = bytearray(data_bytes)
+def _parse_adf_file(filename: Path, suffix: str = None, verbose = False, engine: str = adf_engine_lazy, extract_values: bool = False, dump: bool = False) -> Adf:
+    return _parse_adf_bytes(_read_file(filename), filename.name, suffix, verbose=verbose, engine=engine, extract_values=extract_values, dump=dump)
 
-    # split out header
-    header = data_bytes[0:32]
-    data_bytes = data_bytes[32:]
+def _decompress_adf_file(filename: Path, verbose = False, save_working: bool = None) -> DecompressedAdfFile:
+    if verbose:
+        print(f"Reading {filename}")
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data_bytes:
+        # split out header
+        header = bytearray(data_bytes[0:32])
 
-    # decompress data
-    decompressed_data_bytes = _decompress_bytes(data_bytes)
-    decompressed_data_bytes = bytearray(decompressed_data_bytes)
+        # decompress data
+        with memoryview(data_bytes)[32:] as compressed_data_bytes:
+            decompressed_data_bytes = _decompress_bytes(compressed_data_bytes, read_u32(header[8:12]))
 
-    # split out compression header
+    # split out compression header, deleting from the front of a bytearray does not copy the rest
     decompressed_header = decompressed_data_bytes[0:5]
-    decompressed_data_bytes = decompressed_data_bytes[5:]
+    del decompressed_data_bytes[0:5]
 
-    # save uncompressed adf data to file
+    # only keep a copy of the uncompressed adf data on disk when debugging
     parsed_basename = filename.name
-    adf_file = config.APP_DIR_PATH / f".working/{parsed_basename}_sliced"
-    _save_file(adf_file, decompressed_data_bytes, verbose)
+    if save_working is None:
+        save_working = config.SAVE_WORKING_FILES
+    if save_working:
+        adf_file = config.WORKING_DIR_PATH / f"{parsed_basename}_sliced"
+        _save_file(adf_file, decompressed_data_bytes, verbose)
 
     return DecompressedAdfFile(
         parsed_basename,
-        adf_file,
+        filename,
         header,
         decompressed_header,
         decompressed_data_bytes
     )
 
-def _update_non_instance_offsets(data: bytearray, profile: dict, added_size: int) -> None:
+def _update_non_instance_offsets(decompressed: DecompressedAdfFile, profile: dict, added_size: int) -> None:
   offsets_to_update = [
     (profile["header_instance_offset"], profile["instance_header_start"]),
     (profile["header_typedef_offset"], profile["typedef_start"]),
     (profile["header_nametable_offset"], profile["nametable_start"]),
     (profile["header_total_size_offset"], profile["total_size"]),
-    (profile["instance_header_start"]+12, profile["details"]["instance_offsets"]["instances"][0]["size"])
+    (profile["instance_header_start"]+12, profile["instance_size"])
   ]
   for offset in offsets_to_update:
-    write_value(data, create_u32(offset[1] + added_size), offset[0])
-
-def _insert_animal(data: bytearray, animal: Animal, array: AdfArray) -> None:
-  write_value(data, create_u32(read_u32(data[array.header_length_offset:array.header_length_offset+4])+1), array.header_length_offset)
-  animal_bytes = animal.to_bytes()
-  data[array.array_org_end_offset:array.array_org_end_offset] = animal_bytes
-
-def _remove_animal(data: bytearray, array: AdfArray, index: int) -> None:
-  write_value(data, create_u32(read_u32(data[array.header_length_offset:array.header_length_offset+4])-1), array.header_length_offset)
-  index_offset = array.array_org_start_offset + index * 32
-  del data[index_offset:index_offset+32]
-
-def _update_instance_arrays(data: bytearray, animal_arrays: List[AdfArray], target_array: AdfArray, size: int):
-  arrays_modded = []
-  for animal_array in animal_arrays:    
-    if animal_array.array_start_offset >= target_array.array_end_offset and animal_array.array_start_offset != 0:
-      arrays_modded.append(animal_array)
-      animal_array.array_start_offset = animal_array.array_start_offset + size
-      animal_array.array_end_offset = animal_array.array_end_offset + size
-      animal_array.rel_array_start_offset = animal_array.rel_array_start_offset + size
-      write_value(data, create_u32(animal_array.rel_array_start_offset), animal_array.header_array_offset)
-    # if animal_array.header_start_offset >= target_array.array_end_offset:
-    #   print(animal_array)
-
-def parse_adf(filename: Path, suffix: str = None, verbose = False) -> Adf:
+    decompressed.write(offset[0], create_u32(offset[1] + added_size))
+
+def _insert_animals(decompressed: DecompressedAdfFile, animals: List[Animal], array: AdfArray) -> Tuple[int, int, bytes]:
+  data = decompressed.data
+  decompressed.write(array.header_length_offset, create_u32(read_u32(data[array.header_length_offset:array.header_length_offset+4])+len(animals)))
+  animal_bytes = b"".join(animal.to_bytes() for animal in animals)
+  return (array.array_org_end_offset, 0, animal_bytes)
+
+def _remove_animals(decompressed: DecompressedAdfFile, array: AdfArray, indices: List[int]) -> List[Tuple[int, int, bytes]]:
+  data = decompressed.data
+  decompressed.write(array.header_length_offset, create_u32(read_u32(data[array.header_length_offset:array.header_length_offset+4])-len(indices)))
+  return [(array.array_org_start_offset + index * 32, 32, b"") for index in indices]
+
+def _splice(data: bytearray, splices: List[Tuple[int, int, bytes]]) -> bytearray:
+  # each splice is (offset, bytes to delete, bytes to insert) in the original data, so the
+  # result is built front to back in one pass instead of moving the tail for every edit
+  view = memoryview(data)
+  spliced = bytearray()
+  pos = 0
+  # inserts sort ahead of a removal at the same offset, so neither swallows the other
+  for offset, length, inserted in sorted(splices, key=lambda x: (x[0], x[1])):
+    spliced += view[pos:offset]
+    spliced += inserted
+    pos = offset + length
+  spliced += view[pos:]
+  view.release()
+  return spliced
+
+def _update_instance_arrays(decompressed: DecompressedAdfFile, animal_arrays: List[AdfArray], edits: List[Tuple[AdfArray, int]]) -> None:
+  # every array starting at or after the end of an edited array moves by the size of that edit,
+  # so sort the edits by where they end and look up each array's total shift with a bisect
+  edits = sorted(edits, key=lambda x: x[0].array_end_offset)
+  edit_offsets = [target_array.array_end_offset for target_array, _size in edits]
+  edit_shifts = list(itertools.accumulate(size for _target_array, size in edits))
+  for animal_array in animal_arrays:
+    if animal_array.array_start_offset == 0:
+      continue
+    edit_index = bisect.bisect_right(edit_offsets, animal_array.array_start_offset)
+    if edit_index == 0:
+      continue
+    size = edit_shifts[edit_index-1]
+    animal_array.array_start_offset = animal_array.array_start_offset + size
+    animal_array.array_end_offset = animal_array.array_end_offset + size
+    animal_array.rel_array_start_offset = animal_array.rel_array_start_offset + size
+    decompressed.write(animal_array.header_array_offset, create_u32(animal_array.rel_array_start_offset))
+
+def parse_adf(filename: Path, suffix: str = None, verbose = False, engine: str = adf_engine_lazy, extract_values: bool = False, dump: bool = False) -> Adf:
     if verbose:
         print(f"Parsing {filename}")
-    return _parse_adf_file(filename, suffix, verbose=verbose)
+    return _parse_adf_file(filename, suffix, verbose=verbose, engine=engine, extract_values=extract_values, dump=dump)
 
-def load_adf(filename: Path, verbose = False) -> ParsedAdfFile:
+def load_adf(filename: Path, verbose = False, engine: str = adf_engine_lazy, dump: bool = False) -> ParsedAdfFile:
+    cached = engine == adf_engine_lazy and not dump
+    if cached:
+        parsed = _parsed_cache.get(filename)
+        if parsed is not None:
+            return parsed
     data = _decompress_adf_file(filename, verbose=verbose)
-    adf = parse_adf(data.filename, verbose=verbose)
+    if verbose:
+        print(f"Parsing {filename}")
+    adf = _parse_adf_bytes(data.data, f"{data.basename}_sliced", verbose=verbose, engine=engine, dump=dump)
+    if cached:
+        _parsed_cache.put(filename, data.copy(), adf)
     return ParsedAdfFile(data, adf)
 
 def load_reserve(reserve_name: str, mod: bool = False, verbose = False) -> ParsedAdfFile:
     filename = _get_file_name(reserve_name, mod)
     return load_adf(filename, verbose=verbose)
 
-def add_animals_to_reserve(reserve_name: str, species_key: str, animals: List[Animal], verbose: bool, mod: bool) -> None:
-  print("add animals")
-  if len(animals) == 0:
-    return
-  org_filename = _get_file_name(reserve_name, mod)
-  decompressed_adf = _decompress_adf_file(org_filename, verbose=True)
-  reserve_data = decompressed_adf.data
-  profile = create_profile(decompressed_adf.filename)
-  population_index = config.RESERVES[reserve_name]["species"].index(species_key)  
-  animal_arrays, other_arrays = find_arrays(profile, reserve_data)
-  all_arrays = animal_arrays+other_arrays
+def _plan_add_animals(decompressed: DecompressedAdfFile, animal_arrays: List[AdfArray], population_index: int, animals: List[Animal]) -> Tuple[List[Tuple[AdfArray, int]], List[Tuple[int, int, bytes]]]:
   eligible_animal_arrays = [x for x in animal_arrays if x.population == population_index]
   eligible_animal_arrays = sorted(eligible_animal_arrays, key=lambda x: x.array_start_offset, reverse=True)
-  
-  total_size = animals[0].size * len(animals)
-  _update_non_instance_offsets(reserve_data, profile, total_size)
   n = 1 if len(animals) < len(eligible_animal_arrays) else math.ceil(len(animals) / len(eligible_animal_arrays))
   animal_chunks = [animals[i:i + n] for i in range(0, len(animals), n)]
+  edits = [(eligible_animal_arrays[i], sum(x.size for x in animal_chunk)) for i, animal_chunk in enumerate(animal_chunks)]
+  splices = [_insert_animals(decompressed, animal_chunk, eligible_animal_arrays[i]) for i, animal_chunk in enumerate(animal_chunks)]
   for i, animal_chunk in enumerate(animal_chunks):
-    chosen_array = eligible_animal_arrays[i]
-    for animal in animal_chunk:
-      _update_instance_arrays(reserve_data, all_arrays, chosen_array, animal.size)
-  for i, animal_chunk in enumerate(animal_chunks):
-    chosen_array = eligible_animal_arrays[i]    
-    for animal in animal_chunk:
-      _insert_animal(reserve_data, animal, chosen_array)
-  decompressed_adf.save(config.MOD_DIR_PATH, verbose=True)
+    eligible_animal_arrays[i].length += len(animal_chunk)
+  return (edits, splices)
 
-def remove_animals_from_reserve(reserve_name: str, species_key: str, animal_cnt: int, gender: str, verbose: bool, mod: bool) -> None:
-  print("remove animals")
-  if animal_cnt == 0:
-    return
-  org_filename = _get_file_name(reserve_name, mod)
-  decompressed_adf = _decompress_adf_file(org_filename, verbose=verbose)
-  profile = create_profile(decompressed_adf.filename)
-  reserve_data = decompressed_adf.data 
-  animal_arrays, other_arrays = find_arrays(profile, reserve_data)
-  all_arrays = animal_arrays+other_arrays
-  population_index = config.RESERVES[reserve_name]["species"].index(species_key)
+def _plan_remove_animals(decompressed: DecompressedAdfFile, animal_arrays: List[AdfArray], population_index: int, animal_cnt: int, gender: str) -> Tuple[List[Tuple[AdfArray, int]], List[Tuple[int, int, bytes]]]:
   eligible_animal_arrays = [x for x in animal_arrays if x.population == population_index and ((x.male_cnt > 0 and gender == "male") or (x.female_cnt > 0 and gender == "female"))]
   eligible_animal_arrays = sorted(eligible_animal_arrays, key=lambda x: x.array_start_offset, reverse=True)
   animal_size = 32
@@ -219,15 +442,51 @@ def remove_animals_from_reserve(reserve_name: str, species_key: str, animal_cnt:
   if animals_left_to_remove > 0:
     raise Exception("Not enough animals to remove")
       
-  total_size = animal_size * animal_cnt
-  _update_non_instance_offsets(reserve_data, profile, -total_size)
-  for remove_cnt, animal_array in arrays_to_remove_from:
-    _update_instance_arrays(reserve_data, all_arrays, animal_array, -(animal_size*remove_cnt))
+  edits = [(animal_array, -(animal_size*remove_cnt)) for remove_cnt, animal_array in arrays_to_remove_from]
+  splices = []
   for remove_cnt, animal_array in arrays_to_remove_from:
     remove_indices = animal_array.male_indices if gender == "male" else animal_array.female_indices
-    removed_cnt = 0
-    while removed_cnt < remove_cnt:      
-      _remove_animal(reserve_data, animal_array, remove_indices[remove_cnt-removed_cnt])
-      removed_cnt += 1
-  
+    splices.extend(_remove_animals(decompressed, animal_array, remove_indices[1:remove_cnt+1]))
+    # later plans against the same arrays must not pick the removed animals again
+    remaining_indices = remove_indices[:1] + remove_indices[remove_cnt+1:]
+    if gender == "male":
+      animal_array.male_indices = remaining_indices
+      animal_array.male_cnt = len(remaining_indices)
+    else:
+      animal_array.female_indices = remaining_indices
+      animal_array.female_cnt = len(remaining_indices)
+    animal_array.length -= remove_cnt
+  return (edits, splices)
+
+def _apply_animal_edits(decompressed: DecompressedAdfFile, profile: dict, all_arrays: List[AdfArray], edits: List[Tuple[AdfArray, int]], splices: List[Tuple[int, int, bytes]]) -> None:
+  _update_non_instance_offsets(decompressed, profile, sum(size for _array, size in edits))
+  _update_instance_arrays(decompressed, all_arrays, edits)
+  decompressed.splice(splices)
+
+def add_animals_to_reserve(reserve_name: str, species_key: str, animals: List[Animal], verbose: bool, mod: bool) -> None:
+  print("add animals")
+  if len(animals) == 0:
+    return
+  org_filename = _get_file_name(reserve_name, mod)
+  parsed_adf = load_adf(org_filename, verbose=True)
+  decompressed_adf = parsed_adf.decompressed
+  profile = create_profile(parsed_adf.adf)
+  population_index = config.RESERVES[reserve_name]["species"].index(species_key)  
+  animal_arrays, other_arrays = find_arrays(profile, decompressed_adf.data)
+  edits, splices = _plan_add_animals(decompressed_adf, animal_arrays, population_index, animals)
+  _apply_animal_edits(decompressed_adf, profile, animal_arrays+other_arrays, edits, splices)
+  decompressed_adf.save(config.MOD_DIR_PATH, verbose=True)
+
+def remove_animals_from_reserve(reserve_name: str, species_key: str, animal_cnt: int, gender: str, verbose: bool, mod: bool) -> None:
+  print("remove animals")
+  if animal_cnt == 0:
+    return
+  org_filename = _get_file_name(reserve_name, mod)
+  parsed_adf = load_adf(org_filename, verbose=verbose)
+  decompressed_adf = parsed_adf.decompressed
+  profile = create_profile(parsed_adf.adf)
+  animal_arrays, other_arrays = find_arrays(profile, decompressed_adf.data)
+  population_index = config.RESERVES[reserve_name]["species"].index(species_key)
+  edits, splices = _plan_remove_animals(decompressed_adf, animal_arrays, population_index, animal_cnt, gender)
+  _apply_animal_edits(decompressed_adf, profile, animal_arrays+other_arrays, edits, splices)
   decompressed_adf.save(config.MOD_DIR_PATH, verbose=verbose)
\ No newline at end of file
@@ -0,0 +1,119 @@
+import os, hashlib, tempfile
+import numpy as np
+from pathlib import Path
+from apc import config, adf
+from apc.animal_table import AnimalTable, ANIMAL_FIELDS, create_animal_table, get_populations
+from typing import Tuple
+
+INDEX_VERSION = 1
+_COLUMNS = ["population", "group", "gender", "weight", "score", "go", "visual_seed"]
+
+def _index_path(filename: Path) -> Path:
+  # saves and mods share file names, so the index is named after the full path
+  path_hash = hashlib.sha1(str(Path(filename).resolve()).encode("utf-8")).hexdigest()[:12]
+  return config.INDEX_DIR_PATH / f"{Path(filename).name}_{path_hash}.npz"
+
+def _file_stat(filename: Path) -> Tuple[int, int]:
+  stat = os.stat(filename)
+  return (stat.st_size, stat.st_mtime_ns)
+
+def _file_hash(filename: Path) -> str:
+  return hashlib.sha1(Path(filename).read_bytes()).hexdigest()
+
+def _table_offsets(table: AnimalTable) -> dict:
+  return {
+    "Gender": table.gender_offset,
+    "Weight": table.weight_offset,
+    "Score": table.score_offset,
+    "IsGreatOne": table.go_offset,
+    "VisualVariationSeed": table.visual_seed_offset
+  }
+
+def _write_index(index_path: Path, table: AnimalTable, population_cnt: int, stat: Tuple[int, int], file_hash: str) -> None:
+  index_path.parent.mkdir(exist_ok=True, parents=True)
+  arrays = { name: getattr(table, name) for name in _COLUMNS }
+  arrays.update({ f"{name}_offset": offset for name, offset in _table_offsets(table).items() })
+  with tempfile.NamedTemporaryFile(dir=index_path.parent, prefix=f".{index_path.name}.", delete=False) as f:
+    try:
+      np.savez(
+        f,
+        version=np.array(INDEX_VERSION),
+        size=np.array(stat[0], dtype=np.int64),
+        mtime=np.array(stat[1], dtype=np.int64),
+        hash=np.array(file_hash),
+        population_cnt=np.array(population_cnt),
+        **arrays
+      )
+      f.close()
+      os.replace(f.name, index_path)
+    except:
+      f.close()
+      os.remove(f.name)
+      raise
+
+def _read_index(index_path: Path) -> dict:
+  try:
+    with np.load(index_path, allow_pickle=False) as index:
+      if int(index["version"]) != INDEX_VERSION:
+        return None
+      return { name: index[name] for name in index.files }
+  except Exception:
+    # a truncated or otherwise unreadable index is rebuilt from the population file
+    return None
+
+def _table_from_index(index: dict) -> AnimalTable:
+  return AnimalTable(*[index[name] for name in _COLUMNS], { name: index[f"{name}_offset"] for name in ANIMAL_FIELDS })
+
+def load_table(filename: Path, verbose: bool = False) -> Tuple[AnimalTable, int]:
+  """animal table and population count of a population file, rebuilt only when the file has changed"""
+  index_path = _index_path(filename)
+  stat = _file_stat(filename)
+  index = _read_index(index_path)
+  if index is not None and (int(index["size"]), int(index["mtime"])) == stat:
+    return (_table_from_index(index), int(index["population_cnt"]))
+
+  file_hash = _file_hash(filename)
+  if index is not None and str(index["hash"]) == file_hash:
+    table = _table_from_index(index)
+    population_cnt = int(index["population_cnt"])
+  else:
+    if verbose:
+      print(f"Indexing {filename}")
+    populations = get_populations(adf.load_adf(filename, verbose=verbose).adf)
+    table = create_animal_table(populations)
+    population_cnt = len(populations)
+  try:
+    _write_index(index_path, table, population_cnt, stat, file_hash)
+  except OSError:
+    # the index only saves time, so carry on without it when the cache folder is not writable
+    pass
+  return (table, population_cnt)
+
+def is_current(filename: Path) -> bool:
+  """whether the index of a population file can be used without rebuilding it"""
+  try:
+    with np.load(_index_path(filename), allow_pickle=False) as index:
+      return int(index["version"]) == INDEX_VERSION and (int(index["size"]), int(index["mtime"])) == _file_stat(filename)
+  except Exception:
+    return False
+
+def reserve_is_current(reserve_key: str, mod: bool = False) -> bool:
+  try:
+    return is_current(adf._get_file_name(reserve_key, mod))
+  except adf.FileNotFound:
+    # there is nothing to index, so there is nothing to rebuild either
+    return True
+
+def load_reserve_table(reserve_key: str, mod: bool = False, verbose: bool = False) -> Tuple[AnimalTable, int]:
+  return load_table(adf._get_file_name(reserve_key, mod), verbose=verbose)
+
+def update_index(mod: bool = False, verbose: bool = False) -> None:
+  for reserve_key in config.reserve_keys():
+    try:
+      load_reserve_table(reserve_key, mod, verbose)
+    except adf.FileNotFound:
+      continue
+
+def clear_index() -> None:
+  for index_path in config.INDEX_DIR_PATH.glob("*.npz"):
+    index_path.unlink()
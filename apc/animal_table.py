@@ -0,0 +1,146 @@
+import numpy as np
+from deca.ff_adf import Adf, AdfValue, AdfStructArray
+from apc.utils import gather_read
+from typing import List, Tuple
+
+ANIMAL_FIELDS = ["Gender", "Weight", "Score", "IsGreatOne", "VisualVariationSeed"]
+
+class AnimalTable:
+  """Every animal of a reserve as NumPy columns, in the order they are stored in the population file"""
+  def __init__(self, population: np.ndarray, group: np.ndarray, gender: np.ndarray, weight: np.ndarray, score: np.ndarray, go: np.ndarray, visual_seed: np.ndarray, offsets: dict) -> None:
+    self.population = population
+    self.group = group
+    self.gender = gender
+    self.weight = weight
+    self.score = score
+    self.go = go
+    self.visual_seed = visual_seed
+    self.gender_offset = offsets["Gender"]
+    self.weight_offset = offsets["Weight"]
+    self.score_offset = offsets["Score"]
+    self.go_offset = offsets["IsGreatOne"]
+    self.visual_seed_offset = offsets["VisualVariationSeed"]
+
+  def __len__(self) -> int:
+    return len(self.population)
+
+  def __repr__(self) -> str:
+    return f"AnimalTable({len(self)} animals)"
+
+  @property
+  def male(self) -> np.ndarray:
+    return self.gender == 1
+
+  def select(self, index) -> "AnimalTable":
+    """rows picked by a slice, a boolean mask or an array of row numbers"""
+    return AnimalTable(
+      self.population[index],
+      self.group[index],
+      self.gender[index],
+      self.weight[index],
+      self.score[index],
+      self.go[index],
+      self.visual_seed[index],
+      {
+        "Gender": self.gender_offset[index],
+        "Weight": self.weight_offset[index],
+        "Score": self.score_offset[index],
+        "IsGreatOne": self.go_offset[index],
+        "VisualVariationSeed": self.visual_seed_offset[index]
+      }
+    )
+
+  def read_rows(self, data: bytearray, rows: np.ndarray) -> "AnimalTable":
+    """a copy with only the given rows read again from data"""
+    table = self.select(slice(None))
+    table.gender = self.gender.copy()
+    table.weight = self.weight.copy()
+    table.score = self.score.copy()
+    table.go = self.go.copy()
+    table.visual_seed = self.visual_seed.copy()
+    table.gender[rows] = gather_read(data, self.gender_offset[rows], "<u1")
+    table.weight[rows] = gather_read(data, self.weight_offset[rows], "<f4")
+    table.score[rows] = gather_read(data, self.score_offset[rows], "<f4")
+    table.go[rows] = gather_read(data, self.go_offset[rows], "<u1") == 1
+    table.visual_seed[rows] = gather_read(data, self.visual_seed_offset[rows], "<u4")
+    return table
+
+  def rows_in_ranges(self, ranges: List[Tuple[int, int]]) -> np.ndarray:
+    """rows with a field inside any of the sorted, non-overlapping (start, end) byte ranges"""
+    if len(ranges) == 0:
+      return np.empty(0, dtype=np.int64)
+    starts = np.array([start for start, _end in ranges], dtype=np.int64)
+    ends = np.array([end for _start, end in ranges], dtype=np.int64)
+    changed = np.zeros(len(self), dtype=bool)
+    # every field is written as 4 bytes
+    for offsets in [self.gender_offset, self.weight_offset, self.score_offset, self.go_offset, self.visual_seed_offset]:
+      range_i = np.searchsorted(starts, offsets + 4, side="left") - 1
+      changed |= (range_i >= 0) & (ends[np.maximum(range_i, 0)] > offsets)
+    return np.flatnonzero(changed)
+
+  def population_rows(self, population: int) -> "AnimalTable":
+    start, end = np.searchsorted(self.population, [population, population + 1])
+    return self.select(slice(start, end))
+
+  def group_rank(self) -> np.ndarray:
+    """position of each animal within its group"""
+    rows = np.arange(len(self))
+    group_start = np.ones(len(self), dtype=bool)
+    group_start[1:] = (self.group[1:] != self.group[:-1]) | (self.population[1:] != self.population[:-1])
+    return rows - np.maximum.accumulate(np.where(group_start, rows, 0))
+
+def get_populations(reserve_details: Adf) -> list:
+  populations = reserve_details.table_instance_full_values[0].value["Populations"].value
+  return [p for p in populations if len(p.value["Groups"].value) > 0]
+
+def _struct_array_columns(groups: List[AdfStructArray]) -> Tuple[dict, dict]:
+  # the offset of every field is the start of its record plus the field's offset in the structure
+  counts = np.array([len(animals) for animals in groups])
+  starts = np.repeat(np.cumsum(counts) - counts, counts)
+  itemsizes = np.repeat([animals.records.dtype.itemsize for animals in groups], counts)
+  record_offsets = np.repeat([int(animals.data_offset) for animals in groups], counts) + (np.arange(counts.sum()) - starts) * itemsizes
+  records = np.concatenate([animals.records for animals in groups])
+  columns = { name: records[name] for name in ANIMAL_FIELDS }
+  offsets = {}
+  for name in ANIMAL_FIELDS:
+    member_offsets = [next(offset for member, _type_hash, offset in animals.members if member == name) for animals in groups]
+    offsets[name] = record_offsets + np.repeat(member_offsets, counts)
+  return (columns, offsets)
+
+def _value_columns(groups: List[list]) -> Tuple[dict, dict]:
+  animals = [animal for group in groups for animal in group]
+  columns = { name: np.array([animal.value[name].value for animal in animals]) for name in ANIMAL_FIELDS }
+  offsets = { name: np.array([animal.value[name].data_offset for animal in animals], dtype=np.int64) for name in ANIMAL_FIELDS }
+  return (columns, offsets)
+
+def create_animal_table(populations: List[AdfValue]) -> AnimalTable:
+  groups = []
+  population_index = []
+  group_index = []
+  for population_i, population in enumerate(populations):
+    for group_i, group in enumerate(population.value["Groups"].value):
+      animals = group.value["Animals"].value
+      if len(animals) > 0:
+        groups.append(animals)
+        population_index.append(population_i)
+        group_index.append(group_i)
+
+  counts = [len(animals) for animals in groups]
+  if len(groups) == 0:
+    columns = { name: np.empty(0) for name in ANIMAL_FIELDS }
+    offsets = { name: np.empty(0, dtype=np.int64) for name in ANIMAL_FIELDS }
+  elif all(isinstance(animals, AdfStructArray) for animals in groups):
+    columns, offsets = _struct_array_columns(groups)
+  else:
+    columns, offsets = _value_columns(groups)
+
+  return AnimalTable(
+    np.repeat(np.array(population_index, dtype=np.int32), counts),
+    np.repeat(np.array(group_index, dtype=np.int32), counts),
+    columns["Gender"].astype(np.uint8),
+    columns["Weight"].astype(np.float64),
+    columns["Score"].astype(np.float64),
+    columns["IsGreatOne"] == 1,
+    columns["VisualVariationSeed"].astype(np.uint32),
+    { name: offsets[name].astype(np.int64) for name in ANIMAL_FIELDS }
+  )
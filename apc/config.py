@@ -1,11 +1,15 @@
 import os
 import re
 import json
+import bisect
+import pickle
+import functools
 import sys
 import locale
 import gettext
 from pathlib import Path
 from enum import Enum
+from types import MappingProxyType
 from apc import __app_name__
 from typing import List, Tuple
 
@@ -29,11 +33,18 @@ def get_languages() -> list:
   return (default_locale, use_languages)
 
 LOCALE_PATH = Path(getattr(sys, '_MEIPASS', Path(__file__).resolve().parent)) / "locale/"
-_default, use_languages = get_languages()
-t = gettext.translation("apc", localedir=LOCALE_PATH, languages=use_languages)
-translate = t.gettext
+_translation = None
+_translations_ready = False
+
+def translate(message: str) -> str:
+  global _translation
+  if _translation is None:
+    _translation = gettext.translation("apc", localedir=LOCALE_PATH, languages=get_languages()[1])
+  return _translation.gettext(message)
 
 def setup_translations() -> None:
+  global _translations_ready
+  _translations_ready = True
   global APC 
   APC = translate("Animal Population Changer")
   global SPECIES
@@ -256,17 +267,15 @@ def setup_translations() -> None:
   MOD_EXPORTED = translate("Mod Exported")
   global MOD_IMPORTED
   MOD_IMPORTED = translate("Mod Imported")  
-  
-setup_translations()
 
 def update_language(locale: str) -> None:
   global use_languages
   use_languages = [locale]
-  t = gettext.translation("apc", localedir=LOCALE_PATH, languages=use_languages)
-  global translate
-  translate = t.gettext
+  global _translation
+  _translation = gettext.translation("apc", localedir=LOCALE_PATH, languages=use_languages)
   setup_translations()
 
+@functools.lru_cache(maxsize=None)
 def _find_saves_path() -> str:
     steam_saves = Path().home() / "Documents/Avalanche Studios/COTW/Saves"
     steam_onedrive = Path().home() / "OneDrive/Documents/Avalanche Studios/COTW/Saves"
@@ -298,22 +307,199 @@ def _find_saves_path() -> str:
 
 APP_DIR_PATH = Path(getattr(sys, '_MEIPASS', Path(__file__).resolve().parent))
 EXPORTS_PATH = APP_DIR_PATH / "exports"
-EXPORTS_PATH.mkdir(exist_ok=True, parents=True)
-DEFAULT_SAVE_PATH = _find_saves_path()
 CONFIG_PATH = APP_DIR_PATH / "config"
 SAVE_PATH = CONFIG_PATH / "save_path.txt"
-SAVE_PATH.parent.mkdir(exist_ok=True, parents=True)
 MOD_DIR_PATH = Path().cwd() / "mods"
-MOD_DIR_PATH.mkdir(exist_ok=True, parents=True)
 BACKUP_DIR_PATH = Path().cwd() / "backups"
-BACKUP_DIR_PATH.mkdir(exist_ok=True, parents=True)
+CACHE_DIR_PATH = Path().cwd() / ".cache"
+CONFIG_SNAPSHOT_PATH = CACHE_DIR_PATH / "config_registry.pickle"
+USE_CONFIG_SNAPSHOT = os.environ.get("APC_CONFIG_SNAPSHOT", "1") == "1"
+WORKING_DIR_PATH = APP_DIR_PATH / ".working"
+INDEX_DIR_PATH = CACHE_DIR_PATH / "index"
+SAVE_WORKING_FILES = os.environ.get("APC_SAVE_WORKING_FILES", "0") == "1"
+ADF_CACHE_SIZE = int(os.environ.get("APC_ADF_CACHE_SIZE", 512 * 1024 * 1024))
 HIGH_NUMBER = 100000
 
-ANIMAL_NAMES = json.load((CONFIG_PATH / "animal_names.json").open())["animal_names"]
-RESERVE_NAMES = json.load((CONFIG_PATH / "reserve_names.json").open())["reserve_names"]
-FUR_NAMES = json.load((CONFIG_PATH / "fur_names.json").open())["fur_names"]
-RESERVES = json.load((CONFIG_PATH / "reserve_details.json").open())
-ANIMALS = json.load((CONFIG_PATH / "animal_details.json").open())
+class SeedFurs:
+  """Fur keys of one species, gender and Great One flag, looked up by visual seed"""
+  def __init__(self, furs: dict) -> None:
+    self.seeds = {}
+    ranges = []
+    for key, seed in furs.items():
+      if isinstance(seed, (range, list, tuple)):
+        seed = range(*seed) if not isinstance(seed, range) else seed
+        ranges.append((seed.start, seed.stop, key))
+      else:
+        self.seeds.setdefault(seed, key)
+    ranges.sort(key=lambda x: x[0])
+    self.range_starts = [start for start, _stop, _key in ranges]
+    self.range_stops = [stop for _start, stop, _key in ranges]
+    self.range_keys = [key for _start, _stop, key in ranges]
+
+  def get(self, seed: int) -> str:
+    key = self.seeds.get(seed)
+    if key is None and self.range_starts:
+      range_i = bisect.bisect_right(self.range_starts, seed) - 1
+      if range_i >= 0 and seed < self.range_stops[range_i]:
+        key = self.range_keys[range_i]
+    return key
+
+def _create_fur_index(animals: dict) -> dict:
+  index = {}
+  for species, animal in animals.items():
+    go_furs = SeedFurs(animal["go"]["furs"] if "go" in animal and "furs" in animal["go"] else {})
+    diamond_furs = animal["diamonds"]["furs"] if "furs" in animal["diamonds"] else {}
+    for gender in ["male", "female"]:
+      index[(species, gender, True)] = go_furs
+      index[(species, gender, False)] = SeedFurs(diamond_furs[gender] if gender in diamond_furs else {})
+  return index
+
+class ConfigRegistry:
+  """The five config files, frozen into read-only mappings and tuples, with lookups derived from them, built once"""
+  def __init__(self, animal_names: dict, reserve_names: dict, fur_names: dict, reserves: dict, animals: dict) -> None:
+    species_by_name = {}
+    for species_key, names in animal_names.items():
+      species_by_name.setdefault(names["animal_name"], species_key)
+    reserve_by_population_file = {}
+    species_reserves = {}
+    for reserve_key, details in reserves.items():
+      reserve_by_population_file.setdefault(f"animal_population_{details['index']}", reserve_key)
+      for species_key in details["species"]:
+        species_reserves.setdefault(species_key, []).append(reserve_key)
+    fur_seeds = {}
+    for species_key, animal in animals.items():
+      go_furs = animal["go"]["furs"] if "go" in animal and "furs" in animal["go"] else {}
+      for gender, furs in animal["diamonds"].get("furs", {}).items():
+        fur_seeds[(species_key, gender, False)] = MappingProxyType(dict(furs))
+      fur_seeds[(species_key, None, True)] = MappingProxyType(dict(go_furs))
+
+    self.animal_names = _freeze(animal_names)
+    self.reserve_names = _freeze(reserve_names)
+    self.fur_names = _freeze(fur_names)
+    self.reserves = _freeze(reserves)
+    self.animals = _freeze(animals)
+    self.species_by_name = MappingProxyType(species_by_name)
+    self.reserve_by_population_file = MappingProxyType(reserve_by_population_file)
+    self.species_reserves = MappingProxyType({ species_key: tuple(dict.fromkeys(keys)) for species_key, keys in species_reserves.items() })
+    self.reserve_species = MappingProxyType({ reserve_key: frozenset(details["species"]) for reserve_key, details in reserves.items() })
+    self.diamond_genders = MappingProxyType({ species_key: animal["diamonds"].get("gender", "male") for species_key, animal in animals.items() })
+    self.fur_seeds = MappingProxyType(fur_seeds)
+    self.fur_index = MappingProxyType(_create_fur_index(animals))
+    self._frozen = True
+
+  def __setattr__(self, name: str, value) -> None:
+    if getattr(self, "_frozen", False):
+      raise AttributeError("ConfigRegistry is read-only")
+    super().__setattr__(name, value)
+
+  def __getstate__(self) -> dict:
+    return { name: _thaw(value) for name, value in self.__dict__.items() }
+
+  def __setstate__(self, state: dict) -> None:
+    for name, value in state.items():
+      object.__setattr__(self, name, _freeze(value))
+
+  @classmethod
+  def from_json(cls, contents: List[bytes]) -> "ConfigRegistry":
+    animal_names, reserve_names, fur_names, reserves, animals = [json.loads(x) for x in contents]
+    return cls(animal_names["animal_names"], reserve_names["reserve_names"], fur_names["fur_names"], reserves, animals)
+
+  @classmethod
+  def load(cls, config_path: Path) -> "ConfigRegistry":
+    return cls.from_json([(config_path / x).read_bytes() for x in CONFIG_FILES])
+
+CONFIG_FILES = ["animal_names.json", "reserve_names.json", "fur_names.json", "reserve_details.json", "animal_details.json"]
+CONFIG_SNAPSHOT_VERSION = 1
+def _freeze(value):
+  if isinstance(value, (dict, MappingProxyType)):
+    return MappingProxyType({ key: _freeze(x) for key, x in value.items() })
+  if isinstance(value, (list, tuple)):
+    return tuple(_freeze(x) for x in value)
+  return value
+
+def _thaw(value):
+  # read-only mappings cannot be pickled
+  if isinstance(value, MappingProxyType):
+    return { key: _thaw(x) for key, x in value.items() }
+  if isinstance(value, tuple):
+    return tuple(_thaw(x) for x in value)
+  return value
+
+def _read_config_snapshot(snapshot_path: Path) -> dict:
+  try:
+    snapshot = pickle.loads(snapshot_path.read_bytes())
+    return snapshot if snapshot["version"] == CONFIG_SNAPSHOT_VERSION else None
+  except Exception:
+    return None
+
+def _write_config_snapshot(snapshot_path: Path, snapshot: dict) -> None:
+  import tempfile
+  try:
+    snapshot_path.parent.mkdir(exist_ok=True, parents=True)
+    with tempfile.NamedTemporaryFile(dir=snapshot_path.parent, prefix=f".{snapshot_path.name}.", delete=False) as f:
+      f.write(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+    os.replace(f.name, snapshot_path)
+  except OSError:
+    # a read-only install still works, it just parses the JSON files every time
+    pass
+
+def load_registry(config_path: Path = None, snapshot_path: Path = None) -> ConfigRegistry:
+  """the config registry from the snapshot when it matches the JSON files, by mtime and size or else by content hash"""
+  config_path = config_path if config_path else CONFIG_PATH
+  snapshot_path = snapshot_path if snapshot_path else CONFIG_SNAPSHOT_PATH
+  files = [config_path / x for x in CONFIG_FILES]
+  stats = [(x.stat().st_size, x.stat().st_mtime_ns) for x in files]
+  snapshot = _read_config_snapshot(snapshot_path) if USE_CONFIG_SNAPSHOT else None
+  if snapshot and snapshot["stats"] == stats:
+    return snapshot["registry"]
+
+  import hashlib
+  contents = [x.read_bytes() for x in files]
+  hashes = [hashlib.sha1(x).hexdigest() for x in contents]
+  if snapshot and snapshot["hashes"] == hashes:
+    registry = snapshot["registry"]
+  else:
+    registry = ConfigRegistry.from_json(contents)
+  if USE_CONFIG_SNAPSHOT:
+    _write_config_snapshot(snapshot_path, { "version": CONFIG_SNAPSHOT_VERSION, "stats": stats, "hashes": hashes, "registry": registry })
+  return registry
+
+_registry = None
+
+def get_registry() -> ConfigRegistry:
+  global _registry
+  if _registry is None:
+    _registry = load_registry()
+  return _registry
+
+_REGISTRY_ATTRIBUTES = {
+  "ANIMAL_NAMES": "animal_names",
+  "RESERVE_NAMES": "reserve_names",
+  "FUR_NAMES": "fur_names",
+  "RESERVES": "reserves",
+  "ANIMALS": "animals",
+  "FUR_INDEX": "fur_index"
+}
+
+def __getattr__(name: str):
+  # the config files, save folder and translations are only loaded once something asks for them
+  if name == "REGISTRY":
+    return get_registry()
+  if name in _REGISTRY_ATTRIBUTES:
+    return getattr(get_registry(), _REGISTRY_ATTRIBUTES[name])
+  if name == "DEFAULT_SAVE_PATH":
+    return _find_saves_path()
+  if name == "use_languages":
+    return get_languages()[1]
+  if name.isupper() and not _translations_ready:
+    setup_translations()
+    if name in globals():
+      return globals()[name]
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def create_app_dirs() -> None:
+  for path in [EXPORTS_PATH, SAVE_PATH.parent, MOD_DIR_PATH, BACKUP_DIR_PATH]:
+    path.mkdir(exist_ok=True, parents=True)
 # TODO: diamonds that can be both genders need different weight / score values
 # TODO: kangaroos with multiple white furs
 # TODO: crocodiles with multiple spots
@@ -398,7 +584,7 @@ def load_config(config_path: Path) -> int:
 def get_save_path() -> Path:
   if SAVE_PATH.exists():
     return Path(SAVE_PATH.read_text())
-  return DEFAULT_SAVE_PATH
+  return _find_saves_path()
 
 def save_path(save_path_location: str) -> None:
   SAVE_PATH.write_text(save_path_location)
@@ -409,26 +595,20 @@ def get_reserve_species_renames(reserve_key: str) -> dict:
 
 def get_species_name(key: str) -> str:
   is_unique = species_unique_to_reserve(key)
-  return F"{translate(ANIMAL_NAMES[key]['animal_name'])}{' ⋆' if is_unique else ''}"
+  return F"{translate(get_registry().animal_names[key]['animal_name'])}{' ⋆' if is_unique else ''}"
 
 def get_fur_name(key: str) -> str:
-  return translate(FUR_NAMES[key]["fur_name"])
+  return translate(get_registry().fur_names[key]["fur_name"])
 
 def get_fur_seed(species_key: str, fur_key: str, gender: str, go: bool = False) -> int:
-  if go:
-    return get_species(species_key)["go"]["furs"][fur_key]
-  else:
-    return get_species(species_key)["diamonds"]["furs"][gender][fur_key]
+  return get_registry().fur_seeds[(species_key, None if go else gender, go)][fur_key]
 
 def species(reserve_key: str, include_keys = False) -> list:
-   species_keys = RESERVES[reserve_key]["species"]
+   species_keys = get_registry().reserves[reserve_key]["species"]
    return [f"{get_species_name(s)}{' (' + s + ')' if include_keys else ''}" for s in species_keys]
 
 def get_species_key(species_name: str) -> str:
-  for animal_name_key, names in ANIMAL_NAMES.items():
-    if names["animal_name"] == species_name:
-      return animal_name_key
-  return None
+  return get_registry().species_by_name.get(species_name)
 
 def get_species_furs(species_key: str, gender: str, go: bool = False) -> List[str]:
   species = get_species(species_key)
@@ -452,56 +632,55 @@ def get_reserve_species_name(species_key: str, reserve_key: str) -> str:
   return get_species_name(species_key)
   
 def get_reserve_name(key: str) -> str:
-  return translate(RESERVE_NAMES[key]["reserve_name"])
+  return translate(get_registry().reserve_names[key]["reserve_name"])
 
 def reserve_keys() -> list:
-  return list(dict.keys(RESERVES))
+  return list(get_registry().reserves.keys())
 
 def reserves(include_keys = False) -> list:
-   keys = list(dict.keys(RESERVES))
+   keys = list(get_registry().reserves.keys())
    return [f"{get_reserve_name(r)}{' (' + r + ')' if include_keys else ''}" for r in keys]  
 
 def get_reserve(reserve_key: str) -> dict:
-  return RESERVES[reserve_key]
+  return get_registry().reserves[reserve_key]
 
 def get_reserve_species(reserve_key: str) -> dict:
   return get_reserve(reserve_key)["species"]
 
 def get_species(species_key: str) -> dict:
-  return ANIMALS[species_key]
+  return get_registry().animals[species_key]
 
 def get_diamond_gender(species_key: str) -> str:
-  species_config = get_species(species_key)["diamonds"]
-  return species_config["gender"] if "gender" in species_config else "male"  
+  return get_registry().diamond_genders[species_key]
 
-def _get_fur(furs: dict, seed: int) -> str:
-  try:
-    return next(key for key, value in furs.items() if value == seed)
-  except:
+def get_fur_key_by_seed(species: str, gender: str, seed: int, is_go: bool = False) -> str:
+  registry = get_registry()
+  if species not in registry.animals:
     return None
+  go_key = registry.fur_index[(species, gender, True)].get(seed) if is_go else None
+  return go_key if go_key else registry.fur_index[(species, gender, False)].get(seed)
 
 def get_animal_fur_by_seed(species: str, gender: str, seed: int, is_go: bool = False) -> str:
-  if species not in ANIMALS:
-     return "-"
-
-  animal = ANIMALS[species]
-  go_furs = animal["go"]["furs"] if "go" in animal and "furs" in animal["go"] else []
-  diamond_furs = animal["diamonds"]["furs"] if "furs" in animal["diamonds"] else []
-  diamond_furs = diamond_furs[gender] if gender in diamond_furs else []
-  go_key = _get_fur(go_furs, seed)
-  diamond_key = _get_fur(diamond_furs, seed)
-  if go_key and is_go:
-    return get_fur_name(go_key)
-  elif diamond_key:
-    return get_fur_name(diamond_key)
-  else:
-    return "-"
+  fur_key = get_fur_key_by_seed(species, gender, seed, is_go)
+  return get_fur_name(fur_key) if fur_key else "-"
+
+def get_animal_furs_by_seed(species: str, genders: List[str], seeds: List[int], is_go: List[bool]) -> List[str]:
+  """fur names of a whole column of animals"""
+  fur_names = {}
+  furs = []
+  for gender, seed, go in zip(genders, seeds, is_go):
+    fur_key = get_fur_key_by_seed(species, gender, seed, go)
+    if fur_key not in fur_names:
+      fur_names[fur_key] = get_fur_name(fur_key) if fur_key else "-"
+    furs.append(fur_names[fur_key])
+  return furs
 
 def valid_species_for_reserve(species: str, reserve: str) -> bool:
-  return reserve in RESERVES and species in RESERVES[reserve]["species"]
+  reserve_species = get_registry().reserve_species
+  return reserve in reserve_species and species in reserve_species[reserve]
 
 def valid_species(species: str) -> bool:
-  return species in list(ANIMALS.keys())
+  return species in get_registry().animals
 
 def valid_go_species(species: str) -> bool:
     return species in GreatOnes.__members__
@@ -510,26 +689,15 @@ def valid_fur_species(species_key: str) -> bool:
   return True
 
 def get_population_file_name(reserve: str):
-    index = RESERVES[reserve]["index"]
+    index = get_registry().reserves[reserve]["index"]
     return f"animal_population_{index}"
   
 def get_population_reserve_key(filename: str):
-  for _reserve, details in RESERVES.items():
-    reserve_filename = f"animal_population_{details['index']}"
-    if reserve_filename == filename:
-      return _reserve
-  return None
+  return get_registry().reserve_by_population_file.get(filename)
   
 def get_population_name(filename: str):
-  for _reserve, details in RESERVES.items():
-    reserve_filename = f"animal_population_{details['index']}"
-    if reserve_filename == filename:
-      return translate(details["name"])
-  return None
+  reserve_key = get_population_reserve_key(filename)
+  return translate(get_registry().reserves[reserve_key]["name"]) if reserve_key else None
 
 def species_unique_to_reserve(species_key: str) -> bool:
-  cnt = 0
-  for _reserve_key, reserve_details in RESERVES.items():
-    if species_key in reserve_details["species"]:
-      cnt += 1
-  return (cnt == 1)
\ No newline at end of file
+  return len(get_registry().species_reserves.get(species_key, ())) == 1
\ No newline at end of file
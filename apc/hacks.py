@@ -1,7 +1,10 @@
-import json, subprocess, pyautogui, time, re
+import json, time, re, io, os, sys, tracemalloc
+import numpy as np
 from pathlib import Path
 from apc import populations, adf, config, utils
-from typing import List
+from deca.ff_adf import Adf, adf_engine_interpreted, adf_engine_lazy
+from deca.file import ArchiveFile
+from typing import List, Tuple
 
 def extract_animal_names(path: Path) -> dict:
   data = json.load(path.open())
@@ -58,20 +61,114 @@ def merge_furs() -> None:
   Path("apc/config/animal_details2.json").write_text(json.dumps(details, indent=2))
 
 def analyze_reserve(path: Path) -> None:
-  pops = populations._get_populations(adf.load_adf(path, True).adf)
-  group_weight = {}
-  for p_i, p in enumerate(pops):
-    groups = p.value["Groups"].value
-    high_weight = 0
-    for g in groups:
-      animals = g.value["Animals"].value
-      for a in animals:
-        a = populations.AdfAnimal(a, "unknown")
-        if a.weight > high_weight:
-          high_weight = a.weight
-    group_weight[p_i] = high_weight
+  reserve = adf.load_adf(path, True).adf
+  pops = populations._get_populations(reserve)
+  animals = populations._get_animal_table(reserve)
+  high_weight = np.zeros(len(pops))
+  np.maximum.at(high_weight, animals.population, animals.weight)
+  group_weight = { p_i: float(weight) for p_i, weight in enumerate(high_weight) }
   print(json.dumps(group_weight, indent=2))
 
+def _peak_memory(cb: callable) -> Tuple[int, float]:
+  tracemalloc.start()
+  start = time.perf_counter()
+  cb()
+  elapsed = time.perf_counter() - start
+  _current, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return (peak, elapsed)
+
+def benchmark_adf_memory(path: Path) -> None:
+  data = adf._decompress_adf_file(path).data
+  def parse(engine: str, extract_values: bool) -> None:
+    Adf().deserialize(ArchiveFile(io.BytesIO(data)), engine=engine, extract_values=extract_values)
+  print(f"{path.name}: {len(data)} bytes decompressed")
+  for engine in [adf_engine_interpreted, adf_engine_lazy]:
+    for extract_values in [True, False]:
+      peak, elapsed = _peak_memory(lambda: parse(engine, extract_values))
+      print(f"engine: {engine:<11} extract_values: {str(extract_values):<5} peak: {peak / 1024 / 1024:8.2f} MB time: {elapsed:6.3f}s")
+
+def benchmark_compress(path: Path, workers: int = None) -> None:
+  decompressed = adf._decompress_adf_file(path)
+  data = [decompressed.header, decompressed.data]
+  size = len(decompressed.header) + len(decompressed.data)
+  print(f"{path.name}: {size} bytes decompressed")
+  compressors = [
+    ("serial", lambda f: adf._compress_to_file(f, data, workers=1)),
+    ("parallel", lambda f: adf._compress_parallel_to_file(f, data, workers=workers))
+  ]
+  for name, compress in compressors:
+    f = io.BytesIO()
+    start = time.perf_counter()
+    compress(f)
+    elapsed = time.perf_counter() - start
+    compressed = f.getvalue()
+    round_trip = adf._decompress_bytes(compressed, size) == decompressed.header + decompressed.data
+    print(f"{name:<8} size: {len(compressed):>10} time: {elapsed:6.3f}s round trip: {round_trip}")
+    if not round_trip:
+      raise Exception(f"{name} compression does not round trip")
+
+# the modules each console script imports before doing any work, with the cumulative import time allowed in ms
+# and the modules that must be left to the code paths that need them
+IMPORT_TIME_BUDGETS = {
+  # apc runs hacks, which needs populations (numpy, deca and rich) but not the mouse automation
+  "apc.hacks": (400, ["pyautogui", "PySimpleGUI"]),
+  # apcgui opens its window once gui is imported; reserves are loaded afterwards
+  "apcgui.gui": (400, ["numpy", "rich", "deca", "pyautogui"]),
+  "apc.config": (50, ["numpy", "rich", "deca", "pyautogui", "PySimpleGUI"])
+}
+
+def _import_times(module: str) -> List[Tuple[str, int, int, int]]:
+  """(module, self, cumulative microseconds, nesting depth) of every import done by importing module, from python -X importtime"""
+  import subprocess
+  code = f"import {module}" if module else "pass"
+  # measure with cached bytecode, the way an installed package starts
+  env = { name: value for name, value in os.environ.items() if name != "PYTHONDONTWRITEBYTECODE" }
+  result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent, env=env)
+  if result.returncode != 0:
+    error = result.stderr.strip().splitlines()[-1]
+    if re.match(r"ModuleNotFoundError: No module named '(?!apc)", error):
+      raise ModuleNotFoundError(error)
+    raise Exception(f"Could not import {module}: {error}")
+  times = []
+  for line in result.stderr.splitlines():
+    match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)", line)
+    if match:
+      times.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3))))
+  # the interpreter imports the same modules at startup for every command, so only count what the import added
+  startup = set() if not module else set(name for name, _self, _cumulative, _depth in _import_times(None))
+  return [(name, self_us, cumulative_us, depth) for name, self_us, cumulative_us, depth in times if name not in startup]
+
+def benchmark_imports(budgets: dict = IMPORT_TIME_BUDGETS, runs: int = 5) -> None:
+  """import time of the entry points against their budgets in milliseconds; fails when one regresses past its budget"""
+  failed = []
+  for module, (budget, lazy_modules) in budgets.items():
+    best = None
+    try:
+      # the first import also writes the bytecode cache the timed runs read
+      _import_times(module)
+    except ModuleNotFoundError as ex:
+      # a dependency of the entry point is not installed, so there is nothing to measure
+      print(f"{module:<16} skipped: {ex}")
+      continue
+    for _ in range(runs):
+      times = _import_times(module)
+      total = sum(cumulative_us for _name, _self, cumulative_us, depth in times if depth == 1) / 1000
+      if best is None or total < best[0]:
+        best = (total, times)
+    total, times = best
+    loaded = [name for name in lazy_modules if any(x[0] == name for x in times)]
+    status = "ok" if total <= budget and len(loaded) == 0 else "FAIL"
+    print(f"{module:<16} {total:8.2f} ms budget: {budget:>4} ms modules: {len(times):>4} {status}")
+    for name, self_us, _cumulative, _depth in sorted(times, key=lambda x: x[1], reverse=True)[:5]:
+      print(f"  {name:<40} {self_us / 1000:8.2f} ms")
+    if loaded:
+      print(f"  imported eagerly: {', '.join(loaded)}")
+    if status != "ok":
+      failed.append(module)
+  if failed:
+    raise Exception(f"Import time over budget: {', '.join(failed)}")
+
 def compare_fur_cnt() -> None:
   details = json.load(Path("apc/config/animal_details.json").open())
   global_furs = json.load(Path("scans/global_furs.json").open())
@@ -114,6 +211,7 @@ def reset_ini() -> None:
   filename.write_text(new_content)
   
 def launch_aps() -> None:  
+  import subprocess
   reset_ini()
   subprocess.Popen(f"AnimalPopulationScanner.exe -p > scans\scan.csv", shell=True)  
 
@@ -241,6 +339,7 @@ def combine_furs2(existing: dict, latest: dict, gender: str, last_seed: float, n
   return new_existing
 
 def show_mouse() -> None:
+  import pyautogui
   try:
       while True:
           x, y = pyautogui.position()
@@ -251,17 +350,20 @@ def show_mouse() -> None:
       print('\n')  
 
 def click() -> None:
+  import pyautogui
   pyautogui.mouseDown()
   time.sleep(0.2)
   pyautogui.mouseUp()
 
 def doubleClick() -> None:
+  import pyautogui
   pyautogui.mouseDown()
   pyautogui.mouseUp()
   pyautogui.mouseDown()
   pyautogui.mouseUp()  
 
 def click_reserve(reserve_name: str) -> None:
+  import pyautogui
   pyautogui.moveTo(500, 174, duration=0.5)
   click()
   if reserve_name == "hirsch":
@@ -343,14 +445,13 @@ def seed_animals(reserve_key: str) -> None:
       print(f"{aps_species} already processed")
       continue    
     reserve = adf.load_reserve(reserve_key, False, False)    
-    species_details = populations._species(reserve_key, reserve.adf, species)
-    groups = species_details.value["Groups"].value  
+    animals = populations._species_animals(reserve_key, reserve.adf, species)
     species_furs = {}    
     for gender in [1, 2]:
       seed = 0
       while seed < 12000:
         initial_seed = seed
-        seed = populations.diamond_test_seed(species, groups, reserve.decompressed.data, seed, gender)
+        seed = populations.diamond_test_seed(species, animals, reserve.decompressed, seed, gender)
         print(f"[{initial_seed}-{seed}]")
         reserve.decompressed.save(config.MOD_DIR_PATH, False)
         launch_aps()
@@ -386,14 +487,13 @@ def seed_animals2(reserve_key: str, species: str) -> None:
   aps_species = map_aps(reserve_key, species)
   print(species.upper())   
   reserve = adf.load_reserve(reserve_key, False, False)    
-  species_details = populations._species(reserve_key, reserve.adf, species)
-  groups = species_details.value["Groups"].value  
+  animals = populations._species_animals(reserve_key, reserve.adf, species)
   species_furs = { "male": {}, "female": {} }    
   for gender in [1, 2]:
     seed = 0
     while seed < 12000:
       initial_seed = seed
-      seed = populations.diamond_test_seed(species, groups, reserve.decompressed.data, seed, gender)
+      seed = populations.diamond_test_seed(species, animals, reserve.decompressed, seed, gender)
       print(f"[{initial_seed}-{seed}]")
       reserve.decompressed.save(config.MOD_DIR_PATH, False)
       launch_aps()
@@ -405,7 +505,7 @@ def seed_animals2(reserve_key: str, species: str) -> None:
   print(json.dumps(species_furs, indent=2))
 
 def get_reserve_keys() -> list:
-  return list(dict.keys(config.RESERVES))
+  return list(config.RESERVES.keys())
 
 def test_reserve(reserve_key) -> None:
   print(reserve_key)
@@ -421,9 +521,8 @@ def verify_seeds(seeds: List[int]) -> None:
   reserve_name = "cuatro"
   species = "beceite_ibex" 
   reserve = adf.load_reserve(reserve_name, False, False)
-  species_details = populations._species(reserve_name, reserve.adf, species)
-  groups = species_details.value["Groups"].value
-  populations.diamond_test_seeds(species, groups, reserve.decompressed.data, seeds)
+  animals = populations._species_animals(reserve_name, reserve.adf, species)
+  populations.diamond_test_seeds(species, animals, reserve.decompressed, seeds)
   reserve.decompressed.save(config.MOD_DIR_PATH, False)
   print("done")
 
@@ -1,11 +1,16 @@
-import random
-from apc.utils import update_float, update_uint
+import random, weakref, heapq, itertools, copy, functools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from apc.utils import update_float, update_uint, update_floats, update_uints
 from deca.ff_adf import Adf, AdfValue
 from apc import config, adf, adf_profile
 from rich import print
-from apc.adf import ParsedAdfFile, load_reserve
-from apc.config import get_animal_fur_by_seed, get_species_name, get_reserve_name, get_level_name, get_reserve, valid_species_for_reserve, format_key
-from typing import List
+from apc.adf import ParsedAdfFile, DecompressedAdfFile, load_reserve
+from apc.animal_table import AnimalTable, create_animal_table, get_populations
+from apc import animal_index
+from apc.trophies import get_classifier
+from apc.config import get_animal_furs_by_seed, get_species_name, get_reserve_name, get_level_name, get_reserve, valid_species_for_reserve, format_key
+from typing import List, Tuple
 
 class AdfAnimal:
     def __init__(self, details: AdfValue, species: str) -> None:
@@ -21,6 +26,22 @@ class AdfAnimal:
       self.visual_seed_offset = details.value["VisualVariationSeed"].data_offset
       self.gender_offset = details.value["Gender"].data_offset
       self.species = species
+
+    @classmethod
+    def from_table(cls, animals: AnimalTable, i: int, species: str) -> "AdfAnimal":
+      animal = cls.__new__(cls)
+      animal.gender = "male" if animals.gender[i] == 1 else "female"
+      animal.weight = float(animals.weight[i])
+      animal.score = float(animals.score[i])
+      animal.go = bool(animals.go[i])
+      animal.visual_seed = int(animals.visual_seed[i])
+      animal.weight_offset = int(animals.weight_offset[i])
+      animal.score_offset = int(animals.score_offset[i])
+      animal.go_offset = int(animals.go_offset[i])
+      animal.visual_seed_offset = int(animals.visual_seed_offset[i])
+      animal.gender_offset = int(animals.gender_offset[i])
+      animal.species = species
+      return animal
             
     def __repr__(self) -> str:
       return str({ 
@@ -61,207 +82,239 @@ def species(reserve_key: str, include_keys = False) -> list:
    return config.species(reserve_key, include_keys)
 
 def _get_populations(reserve_details: Adf) -> list:
-  populations = reserve_details.table_instance_full_values[0].value["Populations"].value
-  return [p for p in populations if len(p.value["Groups"].value) > 0]
-
-def _find_animal_level(weight: float, levels: list) -> int:
-  level = 1  
-  weight = round(weight) if weight > 1 else round(weight, 3)
-  for value_i, value in enumerate(levels):
-    low_bound, high_bound = value  
-    high_bound = round(high_bound) if high_bound > 1 else round(high_bound, 3)
-    if (weight <= high_bound and weight > low_bound) or weight > high_bound:
-      level = value_i + 1
-  return level
+  return get_populations(reserve_details)
+
+_animal_tables = weakref.WeakKeyDictionary()
+
+def _get_animal_table(reserve_details: Adf) -> AnimalTable:
+  if reserve_details not in _animal_tables:
+    _animal_tables[reserve_details] = create_animal_table(_get_populations(reserve_details))
+  return _animal_tables[reserve_details]
+
+def _species_animals(reserve_name: str, reserve_details: Adf, species: str) -> AnimalTable:
+  species_index = config.RESERVES[reserve_name]["species"].index(species)
+  return _get_animal_table(reserve_details).population_rows(species_index)
 
 def _is_go(animal: AdfAnimal) -> bool:
   return animal.gender == "male" and animal.go
 
-def _is_diamond(animal: AdfAnimal) -> bool:
-  known_species = config.valid_species(animal.species)
-  diamond_config = config.ANIMALS[animal.species]["diamonds"]
-  diamond_score = diamond_config["score_low"] if known_species else config.HIGH_NUMBER
-  diamond_gender = config.get_diamond_gender(animal.species)
-  return animal.score >= diamond_score and (animal.gender == diamond_gender or diamond_gender == "both")
-
-def find_animals(species: str, modded = False, good = False, verbose = False, top: bool = False) -> list:
-  reserves = reserve_keys()
-  animals = []
-  for reserve in reserves:
-    if valid_species_for_reserve(species, reserve):
-      try:
-        reserve_details = adf.load_reserve(reserve, modded)
-        reserve_animals = describe_animals(reserve, species, reserve_details.adf, good, verbose)
-        animals.extend(reserve_animals)  
-      except:
-        continue
-  animals = sorted(animals, key = lambda x : x[4], reverse=True)
-  return animals[:10] if top else animals
+def _gender_mask(animals: AnimalTable, gender: str) -> np.ndarray:
+  if gender == "both":
+    return np.ones(len(animals), dtype=bool)
+  return animals.male if gender == "male" else ~animals.male
+
+def _go_mask(animals: AnimalTable) -> np.ndarray:
+  return animals.male & animals.go
+
+def _diamond_mask(animals: AnimalTable, species: str) -> np.ndarray:
+  return get_classifier(species).diamonds(animals)
+
+def _find_reserve_animals(reserve: str, species: str, modded: bool, good: bool, verbose: bool, top: bool) -> list:
+  try:
+    return describe_indexed_animals(reserve, species, modded, good, verbose, top)
+  except (adf.FileNotFound, OSError):
+    # reserves that have not been played or modded yet have no population file
+    return []
+
+def find_animals(species: str, modded = False, good = False, verbose = False, top: bool = False, parallel: bool = False, workers: int = None) -> list:
+  reserves = [reserve for reserve in reserve_keys() if valid_species_for_reserve(species, reserve)]
+  find = functools.partial(_find_reserve_animals, species=species, modded=modded, good=good, verbose=verbose, top=top)
+  # reading an up to date index is much cheaper than starting workers, so only reserves that have to be indexed again are sent to them
+  stale = [reserve for reserve in reserves if not animal_index.reserve_is_current(reserve, modded)] if parallel else []
+  found = {}
+  if len(stale) > 1:
+    # workers only send back the result rows, never the parsed reserve
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+      found = dict(zip(stale, executor.map(find, stale)))
+  animals = itertools.chain.from_iterable(found[reserve] if reserve in found else find(reserve) for reserve in reserves)
+  if top:
+    return heapq.nlargest(10, animals, key = lambda x : x[4])
+  return sorted(animals, key = lambda x : x[4], reverse=True)
 
 def describe_animals(reserve_name: str, species: str, reserve_details: Adf, good = False, verbose = False, top: bool = False) -> list:
-    populations = _get_populations(reserve_details)
-    population = populations[get_reserve(reserve_name)["species"].index(species)]
-    groups = population.value["Groups"].value
+    return _describe_table_animals(reserve_name, species, _get_animal_table(reserve_details), good, verbose, top)
+
+def describe_indexed_animals(reserve_name: str, species: str, modded: bool = False, good = False, verbose = False, top: bool = False) -> list:
+    """describe_animals answered from the animal index instead of the population file"""
+    table, _population_cnt = animal_index.load_reserve_table(reserve_name, modded, verbose)
+    return _describe_table_animals(reserve_name, species, table, good, verbose, top)
+
+def _describe_table_animals(reserve_name: str, species: str, table: AnimalTable, good = False, verbose = False, top: bool = False) -> list:
+    animals = table.population_rows(get_reserve(reserve_name)["species"].index(species))
     
     if verbose:
       print(f"processing {format_key(species)} animals...")
 
     rows = []
 
-    known_species = config.valid_species(species)
-    diamond_config = config.ANIMALS[species]["diamonds"]
-    diamond_weight = diamond_config["weight_low"] if known_species else config.HIGH_NUMBER
-    diamond_score = diamond_config["score_low"] if known_species else config.HIGH_NUMBER
-    animal_levels = diamond_config["levels"] if known_species else []
-
-    if verbose and diamond_score != config.HIGH_NUMBER:
-      print(f"Species: {species}, Diamond Weight: {diamond_weight}, Diamond Score: {diamond_score}")
-
-    for group in groups:
-      animals = group.value["Animals"].value
-
-      for animal in animals:
-        animal = AdfAnimal(animal, species)
-        is_diamond = _is_diamond(animal)
-        is_go = _is_go(animal)
-        
-        if ((good and (is_diamond or is_go)) or not good):
-          level = _find_animal_level(animal.weight, animal_levels) if not is_go else 10
-          level_name = get_level_name(config.Levels(level))          
-          rows.append([
-            get_reserve_name(reserve_name),
-            f"{level_name}, {level}",
-            config.MALE if animal.gender == "male" else config.FEMALE,
-            round(animal.weight,2),
-            round(animal.score, 2),
-            get_animal_fur_by_seed(species, animal.gender, animal.visual_seed, is_go),
-            config.YES if is_diamond and not is_go else "-",
-            config.YES if is_go else "-",
-            animal
-          ])
+    classifier = get_classifier(species)
+    if verbose and classifier.diamond_score != config.HIGH_NUMBER:
+      print(f"Species: {species}, Diamond Weight: {classifier.diamond_weight}, Diamond Score: {classifier.diamond_score}")
 
-    rows.sort(key=lambda x: x[4], reverse=True)
-    return rows[:10] if top else rows 
+    levels, is_diamond, is_go = classifier.classify(animals)
+    selected = is_diamond | is_go if good else np.ones(len(animals), dtype=bool)
 
-def describe_reserve(reserve_key: str, reserve_details: Adf, include_species = True, verbose = False) -> tuple:
-    populations = _get_populations(reserve_details)
-    reserve_species = config.get_reserve(reserve_key)["species"]
-    if verbose:
-      print(f"processing {len(populations)} species...")
-
-    rows = []
-    total_cnt = 0
-    population_cnt = 0
-    species_groups = {}
-    
-    for population_i, population in enumerate(populations):
-      groups = population.value["Groups"].value
-      animal_cnt = 0
-      population_high_weight = 0        
-      population_high_score = 0
-      female_cnt = 0
-      male_cnt = 0
-      go_cnt = 0
-      diamond_cnt = 0
-      female_groups = []
-      male_groups = []
-
-      species_key = config.RESERVES[reserve_key]["species"][population_cnt] if include_species else str(population_cnt)
-      known_species = species_key in config.ANIMALS.keys()
-      diamond_weight = config.ANIMALS[species_key]["diamonds"]["weight_low"] if known_species else config.HIGH_NUMBER
-      diamond_score = config.ANIMALS[species_key]["diamonds"]["score_low"] if known_species else config.HIGH_NUMBER
-      species_level = len(config.ANIMALS[species_key]["diamonds"]["levels"])
-      species_name = f"{species_level}. {config.get_reserve_species_name(species_key, reserve_key)}"
-      population_cnt += 1
-
-      if verbose and diamond_score != config.HIGH_NUMBER:
-        print(f"Species: {species_name}, Diamond Weight: {diamond_weight}, Diamond Score: {diamond_score}")
-
-      for group_i, group in enumerate(groups):
-        animals = group.value["Animals"].value
-        group_animal_cnt = len(animals)
-        animal_cnt += group_animal_cnt
-        total_cnt += group_animal_cnt
-        group_male_cnt = 0
-        group_female_cnt = 0
-        
-        for animal in animals:
-          animal = AdfAnimal(animal, species_key)
-
-          if animal.gender == "male":
-            male_cnt += 1
-            group_male_cnt += 1
-            if animal.score > population_high_score:
-                population_high_score = animal.score                  
-          else:            
-            female_cnt += 1
-            group_female_cnt += 1
-
-          if animal.weight > population_high_weight:
-              population_high_weight = animal.weight
-
-          if animal.go:
-            go_cnt += 1
-          elif _is_diamond(animal):
-            diamond_cnt += 1
-        if group_male_cnt > 0:
-          male_groups.append(group_i)
-        if group_female_cnt > 0:
-          female_groups.append(group_i)
-          
-      species_groups[reserve_species[population_i]] = { "male": male_groups, "female": female_groups }
+    selected = np.flatnonzero(selected)
+    genders = np.where(animals.male[selected], "male", "female").tolist()
+    furs = get_animal_furs_by_seed(species, genders, animals.visual_seed[selected].tolist(), is_go[selected].tolist())
 
+    for row_i, i in enumerate(selected):
+      animal = AdfAnimal.from_table(animals, i, species)
+      level = int(levels[i])
+      level_name = get_level_name(config.Levels(level))          
       rows.append([
-        species_key,
-        species_level,
-        species_name, 
-        animal_cnt,
-        male_cnt,
-        female_cnt,
-        round(population_high_weight, 2), 
-        round(population_high_score, 2),
-        diamond_cnt,
-        go_cnt
+        get_reserve_name(reserve_name),
+        f"{level_name}, {level}",
+        config.MALE if animal.gender == "male" else config.FEMALE,
+        round(animal.weight,2),
+        round(animal.score, 2),
+        furs[row_i],
+        config.YES if is_diamond[i] and not is_go[i] else "-",
+        config.YES if is_go[i] else "-",
+        animal
       ])
 
-    return (sorted(rows, key = lambda x: x[1]), species_groups)
+    rows.sort(key=lambda x: x[4], reverse=True)
+    return rows[:10] if top else rows 
+
+def describe_reserve(reserve_key: str, reserve_details: Adf, include_species = True, verbose = False) -> tuple:
+    return _describe_table_reserve(reserve_key, _get_animal_table(reserve_details), len(_get_populations(reserve_details)), include_species, verbose)
+
+def describe_indexed_reserve(reserve_key: str, modded: bool = False, include_species = True, verbose = False) -> tuple:
+    """describe_reserve answered from the animal index instead of the population file"""
+    table, population_cnt = animal_index.load_reserve_table(reserve_key, modded, verbose)
+    return _describe_table_reserve(reserve_key, table, population_cnt, include_species, verbose)
+
+def _describe_table_reserve(reserve_key: str, table: AnimalTable, species_cnt: int, include_species = True, verbose = False) -> tuple:
+    return ReserveSummary(reserve_key, table, species_cnt, include_species, verbose).describe()
+
+def _describe_population(reserve_key: str, population_i: int, animals: AnimalTable, include_species = True, verbose = False) -> Tuple[list, dict]:
+    species_key = config.RESERVES[reserve_key]["species"][population_i] if include_species else str(population_i)
+    classifier = get_classifier(species_key)
+    species_level = classifier.level_cnt
+    species_name = f"{species_level}. {config.get_reserve_species_name(species_key, reserve_key)}"
+
+    if verbose and classifier.diamond_score != config.HIGH_NUMBER:
+      print(f"Species: {species_name}, Diamond Weight: {classifier.diamond_weight}, Diamond Score: {classifier.diamond_score}")
+
+    male = animals.male
+    animal_cnt = len(animals)
+    male_cnt = int(np.count_nonzero(male))
+    female_cnt = animal_cnt - male_cnt
+    population_high_weight = max(0, float(animals.weight.max())) if animal_cnt > 0 else 0
+    population_high_score = max(0, float(animals.score[male].max())) if male_cnt > 0 else 0
+    go_cnt = int(np.count_nonzero(animals.go))
+    diamond_cnt = int(np.count_nonzero(~animals.go & classifier.diamonds(animals)))
+    male_groups = np.unique(animals.group[male]).tolist()
+    female_groups = np.unique(animals.group[~male]).tolist()
+
+    row = [
+      species_key,
+      species_level,
+      species_name, 
+      animal_cnt,
+      male_cnt,
+      female_cnt,
+      round(population_high_weight, 2), 
+      round(population_high_score, 2),
+      diamond_cnt,
+      go_cnt
+    ]
+    return (row, { "male": male_groups, "female": female_groups })
+
+class ReserveSummary:
+  """describe_reserve rows kept per species, so after a mod only the species with changed animals are counted again"""
+  def __init__(self, reserve_key: str, table: AnimalTable, species_cnt: int, include_species = True, verbose = False) -> None:
+    if verbose:
+      print(f"processing {species_cnt} species...")
+    self.reserve_key = reserve_key
+    self.table = table
+    self.include_species = include_species
+    self.rows = []
+    self.groups = []
+    self.dirty_cnt = 0
+    for population_i in range(species_cnt):
+      row, groups = _describe_population(reserve_key, population_i, table.population_rows(population_i), include_species, verbose)
+      self.rows.append(row)
+      self.groups.append(groups)
+
+  def copy(self) -> "ReserveSummary":
+    summary = copy.copy(self)
+    summary.rows = list(self.rows)
+    summary.groups = list(self.groups)
+    return summary
+
+  def update(self, data: DecompressedAdfFile) -> None:
+    """count again the species with fields written to data since the last update"""
+    ranges = data.dirty_ranges(self.dirty_cnt)
+    self.dirty_cnt = len(data.dirty)
+    changed_rows = self.table.rows_in_ranges(ranges)
+    if len(changed_rows) == 0:
+      return
+    self.table = self.table.read_rows(data.data, changed_rows)
+    for population_i in np.unique(self.table.population[changed_rows]).tolist():
+      self.rows[population_i], self.groups[population_i] = _describe_population(self.reserve_key, population_i, self.table.population_rows(population_i), self.include_species)
+
+  def describe(self) -> tuple:
+    reserve_species = config.get_reserve(self.reserve_key)["species"]
+    species_groups = { reserve_species[population_i]: groups for population_i, groups in enumerate(self.groups) }
+    return (sorted(self.rows, key = lambda x: x[1]), species_groups)
+
+_reserve_summaries = weakref.WeakKeyDictionary()
+
+def _get_reserve_summary(reserve_key: str, reserve_details: Adf) -> ReserveSummary:
+  if reserve_details not in _reserve_summaries:
+    _reserve_summaries[reserve_details] = ReserveSummary(reserve_key, _get_animal_table(reserve_details), len(_get_populations(reserve_details)))
+  return _reserve_summaries[reserve_details].copy()
 
 def _create_new_animal(animals: List[AdfAnimal]) -> adf_profile.Animal:
   chosen_animal = random.choice(animals)
   seed = random.uniform(0.000001, 0.099999)
   return adf_profile.Animal(chosen_animal.gender, chosen_animal.weight+seed, chosen_animal.score, False, chosen_animal.visual_seed)
 
-def _get_eligible_animals(groups: list, species: str, gender: str = "male", include_diamonds: bool = False) -> list:
-  eligible_animals = []
-  for group in groups:
-    animals = group.value["Animals"].value  
-    for animal in animals:
-      animal = AdfAnimal(animal, species)
-      if (not _is_go(animal)):
-        if not include_diamonds and _is_diamond(animal):
-          continue
-        else:
-          if animal.gender == gender or gender == "both":
-            eligible_animals.append(animal)
-  return eligible_animals
+def _get_eligible_animals(animals: AnimalTable, species: str, gender: str = "male", include_diamonds: bool = False) -> list:
+  eligible = ~_go_mask(animals) & _gender_mask(animals, gender)
+  if not include_diamonds:
+    eligible &= ~_diamond_mask(animals, species)
+  return [AdfAnimal.from_table(animals, i, species) for i in np.flatnonzero(eligible)]
 
-def _update_animal(data: bytearray, animal: AdfAnimal, go: bool, gender: str, weight: float, score: float, visual_seed: int) -> None:
+def _update_animal(data: DecompressedAdfFile, animal: AdfAnimal, go: bool, gender: str, weight: float, score: float, visual_seed: int) -> None:
   update_uint(data, animal.gender_offset, 1 if gender == "male" else 2)
   update_float(data, animal.weight_offset, weight)
   update_float(data, animal.score_offset, score)
   update_uint(data, animal.go_offset, 1 if go else 0)
   update_uint(data, animal.visual_seed_offset, visual_seed)   
 
-def _create_go(animal: AdfAnimal, go_config: dict, data: bytearray, fur: int = None) -> None:
+class AnimalWrites:
+  """Field updates gathered across many animals and applied to the reserve in one scatter per type"""
+  def __init__(self) -> None:
+    self.float_offsets = []
+    self.float_values = []
+    self.uint_offsets = []
+    self.uint_values = []
+
+  def write_float(self, offset: int, value: float) -> None:
+    self.float_offsets.append(offset)
+    self.float_values.append(value)
+
+  def write_uint(self, offset: int, value: int) -> None:
+    self.uint_offsets.append(offset)
+    self.uint_values.append(value)
+
+  def apply(self, data: DecompressedAdfFile) -> None:
+    update_floats(data, np.array(self.float_offsets, dtype=np.int64), np.array(self.float_values, dtype=np.float64))
+    update_uints(data, np.array(self.uint_offsets, dtype=np.int64), np.array(self.uint_values, dtype=np.int64))
+
+def _create_go(animal: AdfAnimal, go_config: dict, writes: AnimalWrites, fur: int = None) -> None:
   new_weight = _random_float(go_config["weight_low"], go_config["weight_high"])
   new_score = _random_float(go_config["score_low"], go_config["score_high"])
   visual_seed = fur if fur else _random_choice(go_config["furs"])
-  update_float(data, animal.weight_offset, new_weight)
-  update_float(data, animal.score_offset, new_score)
-  update_uint(data, animal.go_offset, 1)
-  update_uint(data, animal.visual_seed_offset, visual_seed) 
+  writes.write_float(animal.weight_offset, new_weight)
+  writes.write_float(animal.score_offset, new_score)
+  writes.write_uint(animal.go_offset, 1)
+  writes.write_uint(animal.visual_seed_offset, visual_seed)
 
-def _create_diamond(animal: AdfAnimal, species_config: dict, data: bytearray, fur: int = None, rares: bool = False) -> None:
+def _create_diamond(animal: AdfAnimal, species_config: dict, writes: AnimalWrites, fur: int = None, rares: bool = False) -> None:
   new_weight = _random_float(species_config["weight_low"], species_config["weight_high"])
   new_score = _random_float(species_config["score_low"], species_config["score_high"])
   visual_seed = None
@@ -269,110 +322,100 @@ def _create_diamond(animal: AdfAnimal, species_config: dict, data: bytearray, fu
     visual_seed = fur
   elif rares:
     visual_seed = _random_choice(species_config["furs"][animal.gender])
-  update_float(data, animal.weight_offset, new_weight)
-  update_float(data, animal.score_offset, new_score)
+  writes.write_float(animal.weight_offset, new_weight)
+  writes.write_float(animal.score_offset, new_score)
   if visual_seed != None:
-    update_uint(data, animal.visual_seed_offset, visual_seed)
+    writes.write_uint(animal.visual_seed_offset, visual_seed)
 
-def _create_fur(animal: AdfAnimal, species_config: dict, data: bytearray, fur: int = None) -> None:
+def _create_fur(animal: AdfAnimal, species_config: dict, writes: AnimalWrites, fur: int = None) -> None:
   visual_seed = None
   if fur != None:
     visual_seed = fur
   elif "furs" in species_config and animal.gender in species_config["furs"]:
-    visual_seed = _random_choice(species_config["furs"][animal.gender])  
-  update_uint(data, animal.visual_seed_offset, visual_seed)
+    visual_seed = _random_choice(species_config["furs"][animal.gender])
+  if visual_seed == None:
+    raise Exception(f"There are no {animal.gender} furs to choose from")
+  writes.write_uint(animal.visual_seed_offset, visual_seed)
 
-def _create_male(animal: AdfAnimal, _config: dict, data: bytearray) -> None:
-  update_uint(data, animal.gender_offset, 1)
+def _create_male(animal: AdfAnimal, _config: dict, writes: AnimalWrites) -> None:
+  writes.write_uint(animal.gender_offset, 1)
   
-def _create_female(animal: AdfAnimal, _config: dict, data: bytearray) -> None:
-  update_uint(data, animal.gender_offset, 2)
+def _create_female(animal: AdfAnimal, _config: dict, writes: AnimalWrites) -> None:
+  writes.write_uint(animal.gender_offset, 2)
 
-def _process_all(species: str, species_config: dict, groups: list, reserve_data: bytearray, cb: callable, kwargs = {}, gender: str = "male") -> None:
-  animals = _get_eligible_animals(groups, species, gender=gender)
-  if len(animals) == 0:
+def _process_all(species: str, species_config: dict, animals: AnimalTable, reserve_data: DecompressedAdfFile, cb: callable, kwargs = {}, gender: str = "male") -> None:
+  eligible_animals = _get_eligible_animals(animals, species, gender=gender)
+  if len(eligible_animals) == 0:
     raise NoAnimalsException(f"There are not enough {get_species_name(species)} to process")  
-  for animal in animals:
-    cb(animal, species_config, reserve_data, **kwargs)
+  writes = AnimalWrites()
+  for animal in eligible_animals:
+    cb(animal, species_config, writes, **kwargs)
+  writes.apply(reserve_data)
 
-def _go_all(species: str, groups: list, reserve_data: bytearray) -> None:
+def _go_all(species: str, animals: AnimalTable, reserve_data: DecompressedAdfFile) -> None:
   go_config = config.ANIMALS[species]["go"]
-  _process_all(species, go_config, groups, reserve_data, _create_go)
+  _process_all(species, go_config, animals, reserve_data, _create_go)
 
-def _diamond_all(species: str, groups: list, reserve_data: bytearray, rares: bool = False) -> None:
+def _diamond_all(species: str, animals: AnimalTable, reserve_data: DecompressedAdfFile, rares: bool = False) -> None:
   species_config = config.ANIMALS[species]["diamonds"]
   diamond_gender = config.get_diamond_gender(species)
-  _process_all(species, species_config, groups, reserve_data, _create_diamond, { "rares": rares }, gender=diamond_gender)
-
-def diamond_test_seed(species: str, groups: list, data: bytearray, seed: int, gender: int = 1) -> None:
-  eligible_animals = []
-  for group in groups:
-    animals = group.value["Animals"].value  
-    for animal in animals:
-      animal = AdfAnimal(animal, species)
-      eligible_animals.append(animal)
-        
-  for animal in eligible_animals:
-    update_float(data, animal.weight_offset, seed)
-    update_float(data, animal.score_offset, seed / 10000)
-    update_uint(data, animal.visual_seed_offset, seed)
-    update_uint(data, animal.gender_offset, gender)
-    seed += 1
-  return seed
-
-def diamond_test_seeds(species: str, groups: list, data: bytearray, seeds: List[int]) -> None:
-  eligible_animals = []
-  for group in groups:
-    animals = group.value["Animals"].value  
-    for animal in animals[:len(seeds)]:
-      animal = AdfAnimal(animal, species)
-      eligible_animals.append(animal)
-        
-  for animal_i, animal in enumerate(eligible_animals[:len(seeds)]):
-    seed = seeds[animal_i]
-    update_float(data, animal.weight_offset, seed)
-    update_float(data, animal.score_offset, seed / 10000)
-    update_uint(data, animal.visual_seed_offset, seed)
-    update_uint(data, animal.gender_offset, 1)
-    seed += 1
-  return seed
-
-def _process_furs(species, species_config: dict, furs: list, groups: list, reserve_data: bytearray, cb: callable, gender: str = "male") -> None:
-  eligible_animals = _get_eligible_animals(groups, species, gender=gender) 
+  _process_all(species, species_config, animals, reserve_data, _create_diamond, { "rares": rares }, gender=diamond_gender)
+
+def _write_test_seeds(animals: AnimalTable, data: DecompressedAdfFile, seeds: np.ndarray, gender: int) -> None:
+  update_floats(data, animals.weight_offset, seeds)
+  update_floats(data, animals.score_offset, seeds / 10000)
+  update_uints(data, animals.visual_seed_offset, seeds)
+  update_uints(data, animals.gender_offset, np.full(len(animals), gender))
+
+def diamond_test_seed(species: str, animals: AnimalTable, data: DecompressedAdfFile, seed: int, gender: int = 1) -> None:
+  _write_test_seeds(animals, data, np.arange(seed, seed + len(animals)), gender)
+  return seed + len(animals)
+
+def diamond_test_seeds(species: str, animals: AnimalTable, data: DecompressedAdfFile, seeds: List[int]) -> None:
+  eligible_animals = np.flatnonzero(animals.group_rank() < len(seeds))[:len(seeds)]
+  _write_test_seeds(animals.select(eligible_animals), data, np.array(seeds[:len(eligible_animals)], dtype=np.int64), 1)
+  return seeds[len(eligible_animals) - 1] + 1 if len(eligible_animals) > 0 else None
+
+def _process_furs(species, species_config: dict, furs: list, animals: AnimalTable, reserve_data: DecompressedAdfFile, cb: callable, gender: str = "male") -> None:
+  eligible_animals = _get_eligible_animals(animals, species, gender=gender) 
   if len(eligible_animals) == 0:
     raise NoAnimalsException(f"There are not enough {get_species_name(species)} to process") 
   chosen_animals = random.sample(eligible_animals, k = len(furs))
+  writes = AnimalWrites()
   for animal_i, animal in enumerate(chosen_animals):
-    cb(animal, species_config, reserve_data, fur = furs[animal_i])  
+    cb(animal, species_config, writes, fur = furs[animal_i])
+  writes.apply(reserve_data)
 
-def _go_furs(species: str, groups: list, reserve_data: bytearray) -> None:
+def _go_furs(species: str, animals: AnimalTable, reserve_data: DecompressedAdfFile) -> None:
   go_config = config.ANIMALS[species]["go"]
   go_furs = _dict_values(go_config["furs"])
-  _process_furs(species, go_config, go_furs, groups, reserve_data, _create_go)
+  _process_furs(species, go_config, go_furs, animals, reserve_data, _create_go)
 
-def _diamond_furs(species: str, groups: list, reserve_data: bytearray) -> None:
+def _diamond_furs(species: str, animals: AnimalTable, reserve_data: DecompressedAdfFile) -> None:
   species_config = config.ANIMALS[species]["diamonds"]
   diamond_gender = config.get_diamond_gender(species)
   diamond_furs = config.get_species_furs(species, diamond_gender)
 
-  _process_furs(species, species_config, diamond_furs, groups, reserve_data, _create_diamond, gender=diamond_gender)
+  _process_furs(species, species_config, diamond_furs, animals, reserve_data, _create_diamond, gender=diamond_gender)
 
-def _update_with_furs(species_key: str, groups: list, reserve_data: bytearray, male_fur_keys: List[str], female_fur_keys: List[str], male_fur_cnt: int, female_fur_cnt: int) -> None:
+def _update_with_furs(species_key: str, animals: AnimalTable, reserve_data: DecompressedAdfFile, male_fur_keys: List[str], female_fur_keys: List[str], male_fur_cnt: int, female_fur_cnt: int) -> None:
   species_config = config.ANIMALS[species_key]["diamonds"]
-  male_animals = _get_eligible_animals(groups, species_key, "male", include_diamonds=True)
+  male_animals = _get_eligible_animals(animals, species_key, "male", include_diamonds=True)
   male_animals = random.sample(male_animals, k = male_fur_cnt)
   male_fur_seeds = [config.get_fur_seed(species_key, x, "male") for x in male_fur_keys]
-  female_animals = _get_eligible_animals(groups, species_key, "female", include_diamonds=True)
+  female_animals = _get_eligible_animals(animals, species_key, "female", include_diamonds=True)
   female_animals = random.sample(female_animals, k = female_fur_cnt)
   female_fur_seeds = [config.get_fur_seed(species_key, x, "female") for x in female_fur_keys]
   
+  writes = AnimalWrites()
   for animal in male_animals:
-    _create_fur(animal, species_config, reserve_data, random.choice(male_fur_seeds))  
+    _create_fur(animal, species_config, writes, random.choice(male_fur_seeds))
   for animal in female_animals:
-    _create_fur(animal, species_config, reserve_data, random.choice(female_fur_seeds))
+    _create_fur(animal, species_config, writes, random.choice(female_fur_seeds))
+  writes.apply(reserve_data)
 
-def _process_some(species, species_config: dict, groups: list, reserve_data: bytearray, modifier: int, percentage: bool, cb: callable, kwargs: dict = {}, gender: str = "male", include_diamonds: bool = False) -> None:
-  eligible_animals = _get_eligible_animals(groups, species, gender=gender, include_diamonds=include_diamonds)
+def _process_some(species, species_config: dict, animals: AnimalTable, reserve_data: DecompressedAdfFile, modifier: int, percentage: bool, cb: callable, kwargs: dict = {}, gender: str = "male", include_diamonds: bool = False) -> None:
+  eligible_animals = _get_eligible_animals(animals, species, gender=gender, include_diamonds=include_diamonds)
   if len(eligible_animals) == 0:
     raise NoAnimalsException(f"There are not enough {get_species_name(species)} to process")
   if percentage:
@@ -380,78 +423,88 @@ def _process_some(species, species_config: dict, groups: list, reserve_data: byt
   else:
     animal_cnt = modifier
   chosen_animals = random.sample(eligible_animals, k = animal_cnt)
+  writes = AnimalWrites()
   for animal in chosen_animals:
-    cb(animal, species_config, reserve_data, **kwargs)
+    cb(animal, species_config, writes, **kwargs)
+  writes.apply(reserve_data)
 
-def _go_some(species: str, groups: list, reserve_data: bytearray, modifier: int = None, percentage: bool = False) -> None:
+def _go_some(species: str, animals: AnimalTable, reserve_data: DecompressedAdfFile, modifier: int = None, percentage: bool = False) -> None:
   go_config = config.ANIMALS[species]["go"]
-  _process_some(species, go_config, groups, reserve_data, modifier, percentage, _create_go, include_diamonds=True)
+  _process_some(species, go_config, animals, reserve_data, modifier, percentage, _create_go, include_diamonds=True)
 
-def _diamond_some(species: str, groups: list, reserve_data: bytearray, modifier: int = None, percentage: bool = False, rares: bool = False) -> None:
+def _diamond_some(species: str, animals: AnimalTable, reserve_data: DecompressedAdfFile, modifier: int = None, percentage: bool = False, rares: bool = False) -> None:
   species_config = config.ANIMALS[species]["diamonds"]
   diamond_gender = config.get_diamond_gender(species)
-  _process_some(species, species_config, groups, reserve_data, modifier, percentage, _create_diamond, { "rares": rares }, gender=diamond_gender)
+  _process_some(species, species_config, animals, reserve_data, modifier, percentage, _create_diamond, { "rares": rares }, gender=diamond_gender)
 
-def _furs_some(species: str, groups: list, reserve_data: bytearray, modifier: int = None, percentage: bool = False) -> None:
+def _furs_some(species: str, animals: AnimalTable, reserve_data: DecompressedAdfFile, modifier: int = None, percentage: bool = False) -> None:
   species_config = config.ANIMALS[species]["diamonds"]
-  _process_some(species, species_config, groups, reserve_data, modifier, percentage, _create_fur, gender="both")
+  _process_some(species, species_config, animals, reserve_data, modifier, percentage, _create_fur, gender="both")
 
-def _male_some(species: str, groups: list, reserve_data: bytearray, modifier: int = None, percentage: bool = False) -> None:
-  _process_some(species, {}, groups, reserve_data, modifier, percentage, _create_male, gender = "female")  
+def _male_some(species: str, animals: AnimalTable, reserve_data: DecompressedAdfFile, modifier: int = None, percentage: bool = False) -> None:
+  _process_some(species, {}, animals, reserve_data, modifier, percentage, _create_male, gender = "female")  
   
-def _female_some(species: str, groups: list, reserve_data: bytearray, modifier: int = None, percentage: bool = False) -> None:
-  _process_some(species, {}, groups, reserve_data, modifier, percentage, _create_female, gender = "male")  
+def _female_some(species: str, animals: AnimalTable, reserve_data: DecompressedAdfFile, modifier: int = None, percentage: bool = False) -> None:
+  _process_some(species, {}, animals, reserve_data, modifier, percentage, _create_female, gender = "male")  
 
-def _add_animals(groups: list, reserve_name: str, species_key: str, animal_cnt: int, gender: str, verbose: bool, mod: bool) -> None:
-  eligible_animals = _get_eligible_animals(groups, species_key, gender)
-  animals = []
+def _create_new_animals(animals: AnimalTable, species_key: str, animal_cnt: int, gender: str) -> List[adf_profile.Animal]:
+  eligible_animals = _get_eligible_animals(animals, species_key, gender)
+  new_animals = []
   if animal_cnt:
     for i in range(animal_cnt):
-      animals.append(_create_new_animal(eligible_animals))
+      new_animals.append(_create_new_animal(eligible_animals))
   else:
-    animals.append(_create_new_animal(eligible_animals))
-  adf.add_animals_to_reserve(reserve_name, species_key, animals, verbose, mod)
+    new_animals.append(_create_new_animal(eligible_animals))
+  return new_animals
+
+def _add_animals(animals: AnimalTable, reserve_name: str, species_key: str, animal_cnt: int, gender: str, verbose: bool, mod: bool) -> None:
+  new_animals = _create_new_animals(animals, species_key, animal_cnt, gender)
+  adf.add_animals_to_reserve(reserve_name, species_key, new_animals, verbose, mod)
   
 def _remove_animals(reserve_name: str, species_key: str, modifier: int, gender: str, verbose: bool, mod: bool) -> None:
   adf.remove_animals_from_reserve(reserve_name, species_key, modifier, gender, verbose, mod)
 
 def mod_furs(reserve_name: str, reserve_details: ParsedAdfFile, species_key: str, male_fur_keys: List[str], female_fur_keys: List[str], male_fur_cnt: int, female_fur_cnt: int, verbose: bool = False) -> None:
-  species_details = _species(reserve_name, reserve_details.adf, species_key)
-  groups = species_details.value["Groups"].value
+  animals = _species_animals(reserve_name, reserve_details.adf, species_key)
   species_name = config.get_species_name(species_key)
-  reserve_data = reserve_details.decompressed.data
-  _update_with_furs(species_key, groups, reserve_data, male_fur_keys, female_fur_keys, male_fur_cnt, female_fur_cnt)
+  reserve_data = reserve_details.decompressed
+  _update_with_furs(species_key, animals, reserve_data, male_fur_keys, female_fur_keys, male_fur_cnt, female_fur_cnt)
   print(f"[green]All {species_name} furs have been updated![/green]")
   reserve_details.decompressed.save(config.MOD_DIR_PATH, verbose=verbose)
 
 def mod_diamonds(reserve_name: str, reserve_details: ParsedAdfFile, species_key: str, diamond_cnt: int, male_fur_keys: List[str], female_fur_keys: List[str]) -> list:
-  species_details = _species(reserve_name, reserve_details.adf, species_key)
-  groups = species_details.value["Groups"].value
+  animals = _species_animals(reserve_name, reserve_details.adf, species_key)
   species_name = config.get_species_name(species_key)
-  reserve_data = reserve_details.decompressed.data  
+  reserve_data = reserve_details.decompressed  
+  summary = _get_reserve_summary(reserve_name, reserve_details.adf)
+  _add_diamonds(species_key, animals, reserve_data, diamond_cnt, male_fur_keys, female_fur_keys)
+  print(f"[green]All {diamond_cnt} {species_name} diamonds have been added![/green]")   
+  summary.update(reserve_data)
+  reserve_details.decompressed.save(config.MOD_DIR_PATH)
+  return summary.describe()
+
+def _add_diamonds(species_key: str, animals: AnimalTable, reserve_data: DecompressedAdfFile, diamond_cnt: int, male_fur_keys: List[str], female_fur_keys: List[str]) -> None:
   diamond_gender = config.get_diamond_gender(species_key) 
-  animals = _get_eligible_animals(groups, species_key, diamond_gender)
-  animals = random.sample(animals, k=diamond_cnt)
+  eligible_animals = _get_eligible_animals(animals, species_key, diamond_gender)
+  eligible_animals = random.sample(eligible_animals, k=diamond_cnt)
   
   species_config = config.ANIMALS[species_key]["diamonds"]
   male_fur_seeds = [config.get_fur_seed(species_key, x, "male") for x in male_fur_keys]
   female_fur_seeds = [config.get_fur_seed(species_key, x, "female") for x in female_fur_keys]
-  for animal in animals:
+  writes = AnimalWrites()
+  for animal in eligible_animals:
     if diamond_gender == "male":
-      _create_diamond(animal, species_config, reserve_data, fur=random.choice(male_fur_seeds))
+      _create_diamond(animal, species_config, writes, fur=random.choice(male_fur_seeds))
     elif diamond_gender == "female":
-      _create_diamond(animal, species_config, reserve_data, fur=random.choice(female_fur_seeds))
+      _create_diamond(animal, species_config, writes, fur=random.choice(female_fur_seeds))
     else:
       if random.choice(["male", "female"]) == "male":
         fur = random.choice(male_fur_seeds) if len(male_fur_seeds) > 0 else None
-        _create_diamond(animal, species_config, reserve_data, fur=fur)
+        _create_diamond(animal, species_config, writes, fur=fur)
       else:
         fur = random.choice(female_fur_seeds) if len(female_fur_seeds) > 0 else None
-        _create_diamond(animal, species_config, reserve_data, fur=fur)
-            
-  print(f"[green]All {diamond_cnt} {species_name} diamonds have been added![/green]")   
-  reserve_details.decompressed.save(config.MOD_DIR_PATH)
-  return describe_reserve(reserve_name, load_reserve(reserve_name, True).adf)
+        _create_diamond(animal, species_config, writes, fur=fur)
+  writes.apply(reserve_data)
 
 def mod_animal(reserve_details: ParsedAdfFile, species_key: str, animal: AdfAnimal, go: bool, gender: str, weight: float, score: float, fur_key: str) -> list:
   if fur_key == None:
@@ -459,57 +512,158 @@ def mod_animal(reserve_details: ParsedAdfFile, species_key: str, animal: AdfAnim
     print("Random:", visual_seed)
   else:
     visual_seed = config.get_fur_seed(species_key, fur_key, gender, go)
-  _update_animal(reserve_details.decompressed.data, animal, go, gender, weight, score, visual_seed)
+  _update_animal(reserve_details.decompressed, animal, go, gender, weight, score, visual_seed)
   print(f"[green]Animal has been updated![/green]")   
   reserve_details.decompressed.save(config.MOD_DIR_PATH)  
 
 def mod_animal_cnt(reserve_key:str, reserve_details: ParsedAdfFile, species_key: str, animal_cnt: int, cnt_type: str, gender: str, modded: bool = False) -> list:
-  species_details = _species(reserve_key, reserve_details.adf, species_key)
-  groups = species_details.value["Groups"].value
+  animals = _species_animals(reserve_key, reserve_details.adf, species_key)
   species_name = config.get_species_name(species_key)
     
   if cnt_type == "add":
-    _add_animals(groups, reserve_key, species_key, animal_cnt, gender, False, modded)
+    _add_animals(animals, reserve_key, species_key, animal_cnt, gender, False, modded)
   elif cnt_type == "remove":
     _remove_animals(reserve_key, species_key, animal_cnt, gender, False, modded)
   print(f"[green]All {animal_cnt} {gender} {species_name} animals have been {'added' if cnt_type == 'add' else 'removed'}![/green]")  
   return describe_reserve(reserve_key, load_reserve(reserve_key, True).adf)
 
 def mod(reserve_key: str, reserve_details: ParsedAdfFile, species_key: str, strategy: str, modifier: int = None, percentage: bool = False, rares: bool = False, verbose = False, mod: bool = False):
-  species_details = _species(reserve_key, reserve_details.adf, species_key)
-  groups = species_details.value["Groups"].value
-  species_name = config.get_species_name(species_key)
-  reserve_data = reserve_details.decompressed.data  
+  animals = _species_animals(reserve_key, reserve_details.adf, species_key)
+  reserve_data = reserve_details.decompressed  
+  summary = _get_reserve_summary(reserve_key, reserve_details.adf)
+  _mod_strategy(species_key, animals, reserve_data, strategy, modifier, percentage, rares)
+  summary.update(reserve_data)
+  reserve_details.decompressed.save(config.MOD_DIR_PATH, verbose=verbose)
+  return summary.describe()
 
+def _mod_strategy(species_key: str, animals: AnimalTable, reserve_data: DecompressedAdfFile, strategy: str, modifier: int = None, percentage: bool = False, rares: bool = False) -> None:
+  species_name = config.get_species_name(species_key)
   if (strategy == config.Strategy.go_all):
-    _go_all(species_key, groups, reserve_data)
+    _go_all(species_key, animals, reserve_data)
     print(f"[green]All {species_name} are now Great Ones![/green]")
   elif (strategy == config.Strategy.go_furs):
-    _go_furs(species_key, groups, reserve_data)
+    _go_furs(species_key, animals, reserve_data)
     print(f"[green]All {species_name} Great One furs have been added![/green]")
   elif (strategy == config.Strategy.go_some):
-    _go_some(species_key, groups, reserve_data, modifier, percentage)
+    _go_some(species_key, animals, reserve_data, modifier, percentage)
     print(f"[green]All {modifier}{'%' if percentage else ''} {species_name} are now Great Ones![/green]")
   elif (strategy == config.Strategy.diamond_all):
-    _diamond_all(species_key, groups, reserve_data, rares)
+    _diamond_all(species_key, animals, reserve_data, rares)
     print(f"[green]All {species_name} are now Diamonds![/green]")  
   elif (strategy == config.Strategy.diamond_furs):
-    _diamond_furs(species_key, groups, reserve_data)
+    _diamond_furs(species_key, animals, reserve_data)
     print(f"[green]All {species_name} are now Diamonds![/green]")
   elif (strategy == config.Strategy.diamond_some):
-    _diamond_some(species_key, groups, reserve_data, modifier, percentage, rares)
+    _diamond_some(species_key, animals, reserve_data, modifier, percentage, rares)
     print(f"[green]All {modifier}{'%' if percentage else ''} {species_name} are now Diamonds![/green]")  
   elif (strategy == config.Strategy.males):
-    _male_some(species_key, groups, reserve_data, modifier, percentage)
+    _male_some(species_key, animals, reserve_data, modifier, percentage)
     print(f"[green]All {modifier}{'%' if percentage else ''} {species_name} are now males![/green]")  
   elif (strategy == config.Strategy.females):
-    _female_some(species_key, groups, reserve_data, modifier, percentage)
+    _female_some(species_key, animals, reserve_data, modifier, percentage)
     print(f"[green]All {modifier}{'%' if percentage else ''} {species_name} are now females![/green]") 
   elif (strategy == config.Strategy.furs_some):
-    _furs_some(species_key, groups, reserve_data, modifier, percentage)
+    _furs_some(species_key, animals, reserve_data, modifier, percentage)
     print(f"[green]All {modifier}{'%' if percentage else ''} {species_name} are now random furs![/green]") 
   else:
-    print(f"[red]Unknown strategy: {strategy}")  
-  
-  reserve_details.decompressed.save(config.MOD_DIR_PATH, verbose=verbose)
-  return describe_reserve(reserve_key, load_reserve(reserve_key, True, verbose=verbose).adf, verbose=verbose)
\ No newline at end of file
+    print(f"[red]Unknown strategy: {strategy}")
+
+FURS_STRATEGY = "furs"
+DIAMONDS_STRATEGY = "diamonds"
+
+class ModOperation:
+  """One step of a ModPlan.
+
+  strategy is a config.Strategy value, FURS_STRATEGY to give modifier animals of gender the fur keys in furs[gender],
+  or DIAMONDS_STRATEGY to turn modifier animals into diamonds with the fur keys in furs["male"] and furs["female"]
+  """
+  def __init__(self, species: str, strategy: str, modifier: int = None, percentage: bool = False, furs: dict = None, gender: str = "male", rares: bool = False) -> None:
+    self.species = species
+    self.strategy = strategy
+    self.modifier = modifier
+    self.percentage = percentage
+    self.furs = furs if furs else {}
+    self.gender = gender
+    self.rares = rares
+
+  def __repr__(self) -> str:
+    return f"ModOperation({self.species}, {self.strategy}, {self.modifier}{'%' if self.percentage else ''}, {self.gender})"
+
+class ModPlan:
+  """Many mod operations on one reserve, applied to a single in-memory copy of the population file and saved once"""
+  def __init__(self, reserve_key: str, operations: List[ModOperation] = None, modded: bool = False) -> None:
+    self.reserve_key = reserve_key
+    self.operations = list(operations) if operations else []
+    self.modded = modded
+
+  def add(self, species: str, strategy: str, modifier: int = None, percentage: bool = False, furs: dict = None, gender: str = "male", rares: bool = False) -> "ModPlan":
+    self.operations.append(ModOperation(species, strategy, modifier, percentage, furs, gender, rares))
+    return self
+
+  def _validate(self) -> None:
+    strategies = [x.value for x in config.Strategy] + [FURS_STRATEGY, DIAMONDS_STRATEGY]
+    for operation in self.operations:
+      if operation.strategy not in strategies:
+        raise Exception(f"Unknown strategy: {operation.strategy}")
+      if not valid_species_for_reserve(operation.species, self.reserve_key):
+        raise Exception(f"{operation.species} is not found on {self.reserve_key}")
+
+  def apply(self, verbose: bool = False) -> tuple:
+    self._validate()
+    reserve_details = load_reserve(self.reserve_key, self.modded, verbose=verbose)
+    reserve_data = reserve_details.decompressed
+    reserve_adf = reserve_details.adf
+    species_cnt = len(_get_populations(reserve_adf))
+    summary = _get_reserve_summary(self.reserve_key, reserve_adf)
+    reserve_species = config.RESERVES[self.reserve_key]["species"]
+    # add and remove operations in a row share one profile of the arrays and are spliced in together,
+    # so animals added in the same run are copied from the animals the run started with
+    structure = None
+
+    for operation in self.operations:
+      species_key = operation.species
+      population_index = reserve_species.index(species_key)
+      if operation.strategy in [config.Strategy.add, config.Strategy.remove]:
+        if structure is None:
+          profile = adf_profile.create_profile(reserve_adf)
+          animal_arrays, other_arrays = adf_profile.find_arrays(profile, reserve_data.data)
+          structure = (profile, animal_arrays, other_arrays, [], [])
+        _profile, animal_arrays, _other_arrays, edits, splices = structure
+        if operation.strategy == config.Strategy.add:
+          new_animals = _create_new_animals(summary.table.population_rows(population_index), species_key, operation.modifier, operation.gender)
+          operation_edits, operation_splices = adf._plan_add_animals(reserve_data, animal_arrays, population_index, new_animals)
+        else:
+          operation_edits, operation_splices = adf._plan_remove_animals(reserve_data, animal_arrays, population_index, operation.modifier, operation.gender)
+        edits.extend(operation_edits)
+        splices.extend(operation_splices)
+        continue
+
+      if structure is not None:
+        reserve_adf = self._apply_structure(reserve_data, structure, verbose)
+        summary = ReserveSummary(self.reserve_key, _get_animal_table(reserve_adf), species_cnt)
+        summary.dirty_cnt = len(reserve_data.dirty)
+        structure = None
+      animals = summary.table.population_rows(population_index)
+      if operation.strategy == FURS_STRATEGY:
+        fur_keys = operation.furs.get(operation.gender, [])
+        male_fur_keys, male_fur_cnt = (fur_keys, operation.modifier) if operation.gender == "male" else ([], 0)
+        female_fur_keys, female_fur_cnt = (fur_keys, operation.modifier) if operation.gender == "female" else ([], 0)
+        _update_with_furs(species_key, animals, reserve_data, male_fur_keys, female_fur_keys, male_fur_cnt, female_fur_cnt)
+      elif operation.strategy == DIAMONDS_STRATEGY:
+        _add_diamonds(species_key, animals, reserve_data, operation.modifier, operation.furs.get("male", []), operation.furs.get("female", []))
+      else:
+        _mod_strategy(species_key, animals, reserve_data, operation.strategy, operation.modifier, operation.percentage, operation.rares)
+      # later operations pick animals by their current values
+      summary.update(reserve_data)
+
+    if structure is not None:
+      reserve_adf = self._apply_structure(reserve_data, structure, verbose)
+      summary = ReserveSummary(self.reserve_key, _get_animal_table(reserve_adf), species_cnt)
+    print(f"[green]All {len(self.operations)} mods have been applied![/green]")
+    reserve_data.save(config.MOD_DIR_PATH, verbose=verbose)
+    return summary.describe()
+
+  def _apply_structure(self, reserve_data: DecompressedAdfFile, structure: tuple, verbose: bool) -> Adf:
+    profile, animal_arrays, other_arrays, edits, splices = structure
+    adf._apply_animal_edits(reserve_data, profile, animal_arrays+other_arrays, edits, splices)
+    return adf._parse_adf_bytes(reserve_data.data, f"{reserve_data.basename}_sliced", verbose=verbose)
\ No newline at end of file
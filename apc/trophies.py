@@ -0,0 +1,50 @@
+import numpy as np
+from apc import config
+from apc.animal_table import AnimalTable
+from typing import Tuple
+
+def _round_weight(weight: float) -> float:
+  return round(weight) if weight > 1 else round(weight, 3)
+
+class TrophyClassifier:
+  """Trophy levels and diamond thresholds of one species, compiled from animal_details.json"""
+  def __init__(self, species: str) -> None:
+    known_species = config.valid_species(species)
+    diamond_config = config.ANIMALS[species]["diamonds"] if known_species else {}
+    levels = diamond_config["levels"] if known_species else []
+    self.species = species
+    self.level_cnt = len(levels)
+    self.diamond_weight = diamond_config["weight_low"] if known_species else config.HIGH_NUMBER
+    self.diamond_score = diamond_config["score_low"] if known_species else config.HIGH_NUMBER
+    self.diamond_gender = config.get_diamond_gender(species) if known_species else "male"
+    # an animal reaches a level once its rounded weight is above the lower bound, or above the rounded upper bound
+    thresholds = np.array([min(low, _round_weight(high)) for low, high in levels], dtype=np.float64)
+    # the last level reached wins, so take the minimum of every later threshold to keep them sorted for searchsorted
+    self.thresholds = np.minimum.accumulate(thresholds[::-1])[::-1]
+
+  def levels(self, weights: np.ndarray) -> np.ndarray:
+    weights = np.asarray(weights, dtype=np.float64)
+    rounded = np.rint(weights)
+    small = np.flatnonzero(weights <= 1)
+    rounded[small] = [round(float(weight), 3) for weight in weights[small]]
+    return np.maximum(np.searchsorted(self.thresholds, rounded, side="left"), 1)
+
+  def diamonds(self, animals: AnimalTable) -> np.ndarray:
+    if self.diamond_gender == "both":
+      gender = np.ones(len(animals), dtype=bool)
+    else:
+      gender = animals.male if self.diamond_gender == "male" else ~animals.male
+    return (animals.score >= self.diamond_score) & gender
+
+  def classify(self, animals: AnimalTable) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """level, diamond and Great One flags of every animal; Great Ones are level 10"""
+    go = animals.male & animals.go
+    levels = np.where(go, config.Levels.GREAT_ONE.value, self.levels(animals.weight))
+    return (levels, self.diamonds(animals), go)
+
+_classifiers = {}
+
+def get_classifier(species: str) -> TrophyClassifier:
+  if species not in _classifiers:
+    _classifiers[species] = TrophyClassifier(species)
+  return _classifiers[species]
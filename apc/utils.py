@@ -1,4 +1,5 @@
 import struct
+import numpy as np
 from rich.table import Table
 
 def list_to_table(
@@ -11,15 +12,55 @@ def list_to_table(
 
     return table
 
-def update_uint(data_bytes: bytearray, offset: int, new_value: int) -> None:
+def write_bytes(data_bytes, offset: int, value_bytes: bytes) -> None:
+    """write to a plain bytearray, or through DecompressedAdfFile.write so the change is tracked"""
+    if isinstance(data_bytes, bytearray):
+        data_bytes[offset:offset+len(value_bytes)] = value_bytes
+    else:
+        data_bytes.write(offset, value_bytes)
+
+def update_uint(data_bytes, offset: int, new_value: int) -> None:
     value_bytes = new_value.to_bytes(4, byteorder='little')
-    for i in range(0, len(value_bytes)):
-        data_bytes[offset + i] = value_bytes[i]
+    write_bytes(data_bytes, offset, value_bytes)
 
-def update_float(data_bytes: bytearray, offset: int, new_value: float) -> None:
+def update_float(data_bytes, offset: int, new_value: float) -> None:
     hex_float = struct.pack("f", new_value)
-    for i in range(0, 4):
-        data_bytes[offset + i] = hex_float[i]
+    write_bytes(data_bytes, offset, hex_float)
+
+def scatter_write(data_bytes: bytearray, offsets: np.ndarray, values: np.ndarray, dtype: str) -> None:
+    """write values at byte offsets through typed views of data_bytes, one NumPy scatter per alignment"""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    values = np.asarray(values).astype(dtype)
+    itemsize = np.dtype(dtype).itemsize
+    alignments = offsets % itemsize
+    for alignment in np.unique(alignments):
+        aligned = alignments == alignment
+        view = np.frombuffer(data_bytes, dtype=dtype, count=(len(data_bytes) - alignment) // itemsize, offset=alignment)
+        view[(offsets[aligned] - alignment) // itemsize] = values[aligned]
+
+def gather_read(data_bytes: bytearray, offsets: np.ndarray, dtype: str) -> np.ndarray:
+    """read values at byte offsets through typed views of data_bytes, one NumPy gather per alignment"""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    values = np.empty(len(offsets), dtype=dtype)
+    itemsize = np.dtype(dtype).itemsize
+    alignments = offsets % itemsize
+    for alignment in np.unique(alignments):
+        aligned = alignments == alignment
+        view = np.frombuffer(data_bytes, dtype=dtype, count=(len(data_bytes) - alignment) // itemsize, offset=alignment)
+        values[aligned] = view[(offsets[aligned] - alignment) // itemsize]
+    return values
+
+def write_many(data_bytes, offsets: np.ndarray, values: np.ndarray, dtype: str) -> None:
+    if isinstance(data_bytes, bytearray):
+        scatter_write(data_bytes, offsets, values, dtype)
+    else:
+        data_bytes.write_many(offsets, values, dtype)
+
+def update_uints(data_bytes, offsets: np.ndarray, new_values: np.ndarray) -> None:
+    write_many(data_bytes, offsets, new_values, "<u4")
+
+def update_floats(data_bytes, offsets: np.ndarray, new_values: np.ndarray) -> None:
+    write_many(data_bytes, offsets, new_values, "<f4")
 
 def unformat_key(value: str) -> str:
   """do not use in production code"""
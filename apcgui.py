@@ -1,4 +1,6 @@
-from apcgui.gui import main
+import multiprocessing
+from apcgui.__main__ import main
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -1,6 +1,5 @@
-from apcgui import gui
-
 def main():
+  from apcgui import gui
   gui.main()
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 import PySimpleGUI as sg
 import sys, traceback, time, os, re, shutil, subprocess, textwrap
-from apc import populations, adf, config
+# populations and adf pull in numpy, deca and rich, so they are imported where a reserve is first loaded
+from apc import config
 from apc.config import valid_go_species, Strategy, MOD_DIR_PATH, save_path, get_save_path, get_population_file_name, get_population_name, BACKUP_DIR_PATH, valid_fur_species, format_key, get_reserve_species, get_diamond_gender, get_species_name
 from apcgui import __version__, logo, config
 from typing import List
@@ -17,10 +18,10 @@ VIEW_MOD_LOADED=None
 RESERVE_COLUMNS = None
 SPECIES_COLUMNS = None
 
-reserve_keys = config.reserve_keys()
+reserve_keys = None
 reserve_names = None
 reserve_name_size = None
-save_path_value = get_save_path()
+save_path_value = None
 reserve_description = None
 species_group_details = None
 male_group_cnt = None
@@ -241,7 +242,7 @@ def _is_diamond_enabled(window: sg.Window, value: int) -> bool:
 def _is_go_enabled(window: sg.Window, value: int) -> bool:
   return not window["go_value"].Disabled and value != 0
 
-def _show_error(window: sg.Window, ex: adf.FileNotFound) -> None:
+def _show_error(window: sg.Window, ex: Exception) -> None:
   window["progress"].update(0)      
   window["reserve_note"].update(f"{config.ERROR}: {ex}")      
   print("ERROR", traceback.print_exc(file=sys.stdout))   
@@ -257,6 +258,7 @@ def _clear_furs(window: sg.Window) -> None:
   window["diamond_gender"].update("")
 
 def _mod_furs(window: sg.Window, reserve_key: str, species_key: str, male_fur_keys: List[str], female_fur_keys: List[str], male_fur_cnt: int, female_fur_cnt: int):
+  from apc import populations, adf
   print((reserve_key, species_key, "furs", male_fur_keys, male_fur_cnt, female_fur_keys, female_fur_cnt))
   is_modded = _viewing_modded(window)
   try:
@@ -285,6 +287,7 @@ def _mod_furs(window: sg.Window, reserve_key: str, species_key: str, male_fur_ke
   _clear_furs(window)
 
 def _mod_diamonds(window: sg.Window, reserve_key: str, species_key: str, diamond_cnt: int, male_fur_keys: List[str], female_fur_keys: List[str]) -> None:
+  from apc import populations, adf
   print((reserve_key, species_key, "diamonds", diamond_cnt, male_fur_keys, female_fur_keys))
   global reserve_description
   is_modded = _viewing_modded(window)
@@ -312,7 +315,8 @@ def _mod_diamonds(window: sg.Window, reserve_key: str, species_key: str, diamond
   window["modded_reserves"].update(True)
   window["fur_update_animals"].update(disabled = True)
 
-def _mod_animal(window: sg.Window, reserve_key: str, species_key: str, animal: Animal, adfAnimal: populations.AdfAnimal) -> None:
+def _mod_animal(window: sg.Window, reserve_key: str, species_key: str, animal: Animal, adfAnimal: "populations.AdfAnimal") -> None:
+  from apc import populations, adf
   print((reserve_key, species_key, "mod animal"))
   global reserve_description
   is_modded = _viewing_modded(window)
@@ -339,6 +343,7 @@ def _mod_animal(window: sg.Window, reserve_key: str, species_key: str, animal: A
   window["species_description"].update(select_rows=[])
 
 def _mod(reserve_key: str, species: str, strategy: Strategy, window: sg.Window, modifier: int, rares: bool, percentage: bool = False) -> None:
+  from apc import populations, adf
   print((reserve_key, species, strategy.value, modifier, rares))
   global reserve_description
   is_modded = _viewing_modded(window)
@@ -559,19 +564,19 @@ def _update_animal_details(window: sg.Window, species: str, animal: Animal) -> N
   window["animal_fur"].update(animal.fur, values=animal_fur_names) 
 
 def _show_animals(window: sg.Window, values: dict, reserve_key: str, species: str, species_name: str, modded: bool = False) -> tuple:
+  from apc import populations, adf
   is_modded = values["modded_reserves"] or modded
   is_top = values["top_scores"]  
   window['reserve_warning'].update(visible=False)
-  try:
-    reserve_details = adf.load_reserve(reserve_key, mod=is_modded)
-  except adf.FileNotFound as ex:
-    _show_error(window, ex)
-    return
   window["progress"].update(30)
   if values["all_reserves"]:            
-    species_description_full = populations.find_animals(species, modded=is_modded, good=values["good_ones"], top=is_top)            
+    species_description_full = populations.find_animals(species, modded=is_modded, good=values["good_ones"], top=is_top, parallel=True)            
   else:
-    species_description_full = populations.describe_animals(reserve_key, species, reserve_details.adf, good=values["good_ones"], top=is_top)
+    try:
+      species_description_full = populations.describe_indexed_animals(reserve_key, species, modded=is_modded, good=values["good_ones"], top=is_top)
+    except adf.FileNotFound as ex:
+      _show_error(window, ex)
+      return
   species_description = [x[0:-1] for x in species_description_full]
   animal_details = [x[-1:len(x)][0] for x in species_description_full]
   window["progress"].update(60)
@@ -599,6 +604,10 @@ def _toggle_section_visible(window: sg.Window, section: str, visible: bool = Non
   
 
 def main_window(my_window: sg.Window = None) -> sg.Window:
+    global reserve_keys
+    reserve_keys = config.reserve_keys()
+    global save_path_value
+    save_path_value = get_save_path()
     global reserve_names
     reserve_names = config.reserves()
     global reserve_name_size
@@ -811,10 +820,10 @@ def main_window(my_window: sg.Window = None) -> sg.Window:
     return window
     
 def main() -> None:
+  config.create_app_dirs()
   sg.theme("DarkAmber")
     
   window = main_window()
-  reserve_details = None
   global reserve_description
   global species_group_details
   global male_group_cnt
@@ -838,12 +847,12 @@ def main() -> None:
           else:
             window["reserve_warning"].update(VIEW_MOD_LOADED if _is_reserve_mod_loaded(reserve_key, window) else "")
           window["reserve_note"].update("")   
+          from apc import populations, adf
           try:
-            reserve_details = adf.load_reserve(reserve_key, mod=is_modded)
+            reserve_description, species_groups = populations.describe_indexed_reserve(reserve_key, modded=is_modded)
             window["progress"].update(50)            
           except adf.FileNotFound as ex:
             _show_error(window, ex)    
-            reserve_details = None
             window["reserve_description"].update([])
             window["go_party"].update(disabled=True)
             window["diamond_party"].update(disabled=True)
@@ -851,7 +860,6 @@ def main() -> None:
             window["fur_party"].update(disabled=True)              
             window["show_animals"].update(disabled=True)              
             continue
-          reserve_description, species_groups = populations.describe_reserve(reserve_key, reserve_details.adf)
           _disable_go_parties(window, reserve_key)
           window["diamond_party"].update(disabled=False)
           window["everyone_party"].update(disabled=False)
@@ -1,5 +1,8 @@
 import io
 import enum
+import collections.abc
+import struct
+import numpy as np
 from typing import List, Dict
 from deca.errors import *
 from deca.file import ArchiveFile
@@ -349,7 +352,123 @@ class AdfValue:
 
         return s
 
+
+class AdfStructArray:
+    """
+    Array of flat structures decoded with a single np.frombuffer call into a structured array. Indexing builds the
+    same per element AdfValue structure read_instance returns, records gives the whole array at once.
+    """
+    __slots__ = ('records', 'type_id', 'members', 'data_offset')
+
+    def __init__(self, records, type_id, members, data_offset):
+        self.records = records
+        self.type_id = type_id
+        self.members = members
+        self.data_offset = data_offset
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        for i in range(len(self.records)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.records)))]
+        if index < 0:
+            index += len(self.records)
+        record = self.records[index]
+        p0 = self.data_offset + index * self.records.dtype.itemsize
+        v = {}
+        for name, type_hash, offset in self.members:
+            v[name] = AdfValue(record[name], type_hash, p0 + offset)
+        return AdfValue(v, self.type_id, p0)
+
+    def offsets(self, name):
+        for m_name, _type_hash, offset in self.members:
+            if m_name == name:
+                return self.data_offset + offset + np.arange(len(self.records)) * self.records.dtype.itemsize
+        raise KeyError(name)
+
+    def __repr__(self):
+        return 'AdfStructArray({} x 0x{:08X} @ {})'.format(len(self.records), self.type_id, self.data_offset)
+
+
+class AdfLazyStructure(collections.abc.Mapping):
+    """
+    Structure members that are decoded from the instance buffer the first time they are looked up.
+    """
+    __slots__ = ('plan', 'buffer', 'n_buffer', 'buffer_pos', 'abs_offset', 'values')
+
+    def __init__(self, plan, buffer, n_buffer, buffer_pos, abs_offset):
+        self.plan = plan
+        self.buffer = buffer
+        self.n_buffer = n_buffer
+        self.buffer_pos = buffer_pos
+        self.abs_offset = abs_offset
+        self.values = {}
+
+    def __getitem__(self, name):
+        v = self.values.get(name)
+        if v is None and name not in self.values:
+            m_offset, m_reader, m_bit_offset = self.plan[name]
+            v, _ = m_reader(self.buffer, self.n_buffer, self.buffer_pos + m_offset, self.abs_offset, m_bit_offset)
+            self.values[name] = v
+        return v
+
+    def __iter__(self):
+        return iter(self.plan)
+
+    def __len__(self):
+        return len(self.plan)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class AdfLazyArray(collections.abc.Sequence):
+    """
+    Array of structures where each element is decoded from the instance buffer the first time it is indexed.
+    """
+    __slots__ = ('element_reader', 'buffer', 'n_buffer', 'offset', 'stride', 'abs_offset', 'values')
+
+    def __init__(self, element_reader, buffer, n_buffer, offset, length, stride, abs_offset):
+        self.element_reader = element_reader
+        self.buffer = buffer
+        self.n_buffer = n_buffer
+        self.offset = offset
+        self.stride = stride
+        self.abs_offset = abs_offset
+        self.values = [None] * length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.values)))]
+        v = self.values[index]
+        if v is None:
+            if index < 0:
+                index += len(self.values)
+            v, _ = self.element_reader(
+                self.buffer, self.n_buffer, self.offset + index * self.stride, self.abs_offset)
+            self.values[index] = v
+        return v
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 def adf_format(v, type_map, indent=0):
+    f = io.StringIO()
+    adf_format_to(f, v, type_map, indent)
+    return f.getvalue()
+
+
+def adf_format_to(f, v, type_map, indent=0):
+    """Write the text form of v to the file object f as it is walked, so large trees are dumped in linear time"""
     if isinstance(v, AdfValue):
         type_def = type_map.get(v.type_id, TypeDef())
 
@@ -364,36 +483,32 @@ def adf_format(v, type_map, indent=0):
             s = s + ', Info Offset: {}(0x{:08x})'.format(v.info_offset, v.info_offset)
 
         value_info = s
-        s = ''
         if v.type_id == 0xdefe88ed:
-            s = s + '  ' * indent + '# {}\n'.format(value_info)
-            s = s + adf_format(v.value, type_map, indent)
+            f.write('  ' * indent + '# {}\n'.format(value_info))
+            adf_format_to(f, v.value, type_map, indent)
         elif type_def.metatype is None or type_def.metatype == MetaType.Primative:
-            s = s + '  ' * indent + '{}  # {}\n'.format(v.value, value_info)
+            f.write('  ' * indent + '{}  # {}\n'.format(v.value, value_info))
         elif type_def.metatype == MetaType.Structure:
-            s = s + '  ' * indent + '# ' + value_info + '\n'
-            s = s + '  ' * indent + '{\n'
+            f.write('  ' * indent + '# ' + value_info + '\n')
+            f.write('  ' * indent + '{\n')
             for k, iv in v.value.items():
-                s = s + '  ' * (indent + 1) + k + ':\n'
-                s = s + adf_format(iv, type_map, indent + 2)
-                if not hasattr(iv, 'value'):
-                    pass
-
-            s = s + '  ' * indent + '}\n'
+                f.write('  ' * (indent + 1) + k + ':\n')
+                adf_format_to(f, iv, type_map, indent + 2)
+            f.write('  ' * indent + '}\n')
         elif type_def.metatype == MetaType.Pointer:
-            s = s + '  ' * indent + '{}  # {}\n'.format(v.value, value_info)
+            f.write('  ' * indent + '{}  # {}\n'.format(v.value, value_info))
         elif type_def.metatype in {MetaType.Array, MetaType.InlineArray}:
-            s = s + '  ' * indent + '# ' + value_info + '\n'
-            s = s + '  ' * indent + '[\n'
+            f.write('  ' * indent + '# ' + value_info + '\n')
+            f.write('  ' * indent + '[\n')
             for iv in v.value:
-                s = s + adf_format(iv, type_map, indent + 1)
-            s = s + '  ' * indent + ']\n'
+                adf_format_to(f, iv, type_map, indent + 1)
+            f.write('  ' * indent + ']\n')
         elif type_def.metatype == MetaType.String:
-            s = s + '  ' * indent + '{}  # {}\n'.format(v.value, value_info)
+            f.write('  ' * indent + '{}  # {}\n'.format(v.value, value_info))
         elif type_def.metatype == MetaType.Bitfield:
-            s = s + '  ' * indent + '{}  # {}\n'.format(v.value, value_info)
+            f.write('  ' * indent + '{}  # {}\n'.format(v.value, value_info))
         elif type_def.metatype == MetaType.Enumeration:
-            s = s + '  ' * indent + '{} ({})  # {}\n'.format(v.enum_string, v.value, value_info)
+            f.write('  ' * indent + '{} ({})  # {}\n'.format(v.enum_string, v.value, value_info))
         elif type_def.metatype == MetaType.StringHash:
             if type_def.size == 4:
                 vp = '0x{:08x}'.format(v.value)
@@ -414,31 +529,28 @@ def adf_format(v, type_map, indent=0):
                 if hash_string is None:
                     hash_string = 'OTHER HASH {}'.format(type_def.size)
 
-            s = s + '  ' * indent + '{} ({})  # {}\n'.format(hash_string, vp, value_info)
-
-        return s
+            f.write('  ' * indent + '{} ({})  # {}\n'.format(hash_string, vp, value_info))
     elif isinstance(v, list) and len(v) > 0 and isinstance(v[0], GdcArchiveEntry):
-        s = ''
-        s = s + '  ' * indent + '[\n'
+        f.write('  ' * indent + '[\n')
         for ent in v:
             comment = None
-            s = s + '  ' * (indent + 1) + f'{ent}{comment}\n'
-        s = s + '  ' * indent + ']\n'
-
-        return s
+            f.write('  ' * (indent + 1) + f'{ent}{comment}\n')
+        f.write('  ' * indent + ']\n')
     else:
         comment = None
-        return '  ' * indent + f'{v}{comment}\n'
+        f.write('  ' * indent + f'{v}{comment}\n')
 
 def adf_value_extract(v):
     if isinstance(v, AdfValue):
         return adf_value_extract(v.value)
-    elif isinstance(v, dict):
+    elif isinstance(v, AdfStructArray):
+        return v.records
+    elif isinstance(v, (dict, AdfLazyStructure)):
         n = {}
         for k, iv in v.items():
             n[k] = adf_value_extract(iv)
         return n
-    elif isinstance(v, list):
+    elif isinstance(v, (list, AdfLazyArray)):
         return [adf_value_extract(iv) for iv in v]
     else:
         return v
@@ -736,6 +848,367 @@ def read_instance(
     return v, buffer_pos
 
 
+adf_engine_interpreted = 'interpreted'
+adf_engine_compiled = 'compiled'
+adf_engine_numpy = 'numpy'
+adf_engine_lazy = 'lazy'
+
+prim_read_one = {
+    typedef_s8: ff_read_s8,
+    typedef_u8: ff_read_u8,
+    typedef_s16: ff_read_s16,
+    typedef_u16: ff_read_u16,
+    typedef_s32: ff_read_s32,
+    typedef_u32: ff_read_u32,
+    typedef_s64: ff_read_s64,
+    typedef_u64: ff_read_u64,
+    typedef_f32: ff_read_f32,
+    typedef_f64: ff_read_f64,
+}
+
+prim_struct_formats = {
+    typedef_s8: ('b', np.int8),
+    typedef_u8: ('B', np.uint8),
+    typedef_s16: ('h', np.int16),
+    typedef_u16: ('H', np.uint16),
+    typedef_s32: ('i', np.int32),
+    typedef_u32: ('I', np.uint32),
+    typedef_s64: ('q', np.int64),
+    typedef_u64: ('Q', np.uint64),
+    typedef_f32: ('f', np.float32),
+    typedef_f64: ('d', np.float64),
+}
+
+prim_dtypes = {
+    typedef_s8: '<i1',
+    typedef_u8: '<u1',
+    typedef_s16: '<i2',
+    typedef_u16: '<u2',
+    typedef_s32: '<i4',
+    typedef_u32: '<u4',
+    typedef_s64: '<i8',
+    typedef_u64: '<u8',
+    typedef_f32: '<f4',
+    typedef_f64: '<f8',
+}
+
+
+def adf_struct_dtype(type_def):
+    """numpy dtype matching a Structure typedef, None when a member is not a primitive"""
+    if type_def.metatype != MetaType.Structure or not type_def.members:
+        return None
+    names = [m.name_utf8 for m in type_def.members]
+    if len(set(names)) != len(names):
+        return None
+    formats = []
+    for m in type_def.members:
+        if m.type_hash not in prim_dtypes:
+            return None
+        formats.append(prim_dtypes[m.type_hash])
+    return np.dtype({
+        'names': names,
+        'formats': formats,
+        'offsets': [m.offset for m in type_def.members],
+        'itemsize': type_def.size,
+    })
+
+
+prim_read_many = {
+    typedef_s8: ff_read,
+    typedef_u8: ff_read,
+    typedef_s16: ff_read_s16s,
+    typedef_u16: ff_read_u16s,
+    typedef_s32: ff_read_s32s,
+    typedef_u32: ff_read_u32s,
+    typedef_s64: ff_read_s64s,
+    typedef_u64: ff_read_u64s,
+    typedef_f32: ff_read_f32s,
+    typedef_f64: ff_read_f64s,
+}
+
+
+class AdfReaderCompiler:
+    """
+    Turns type ids into reader closures with the same signature and output as read_instance, minus the schema
+    arguments: reader(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None) -> (v, buffer_pos)
+    The if/elif dispatch and typedef lookups are done once per type hash instead of once per value.
+    With struct_arrays arrays of flat structures are decoded in bulk into an AdfStructArray instead of a list.
+    With lazy structures and arrays of structures only record where they are, members and elements are decoded
+    when first accessed. Strings are only added to found_strings once decoded.
+    """
+
+    def __init__(self, map_typedef, map_string_hash, found_strings=None, struct_arrays=False, lazy=False):
+        self.map_typedef = map_typedef
+        self.map_string_hash = map_string_hash
+        self.found_strings = found_strings
+        self.struct_arrays = struct_arrays
+        self.lazy = lazy
+        self.readers = {}
+
+    def reader(self, type_id):
+        r = self.readers.get(type_id)
+        if r is None:
+            # placeholder so recursive types bind to the finished reader on first use
+            readers = self.readers
+            readers[type_id] = lambda *args: readers[type_id](*args)
+            r = self._compile(type_id)
+            readers[type_id] = r
+        return r
+
+    def _compile(self, type_id):
+        if type_id in prim_read_one:
+            return self._compile_primitive(type_id)
+        elif type_id == 0x8955583e:
+            return self._compile_string(type_id)
+        elif type_id == 0xdefe88ed:  # deferred value
+            return self._compile_deferred(type_id)
+        elif type_id == 0x178842fe:  # gdc/global.gdcc
+            return self._compile_interpreted(type_id)
+
+        if type_id not in self.map_typedef:
+            return self._compile_error(EDecaMissingAdfType, type_id)
+        type_def = self.map_typedef[type_id]
+
+        if type_def.metatype == 0:  # Primative
+            return self._compile_error(EDecaMissingAdfType, type_id)
+        elif type_def.metatype == 1:  # Structure
+            return self._compile_structure(type_id, type_def)
+        elif type_def.metatype == 2:  # Pointer
+            return self._compile_pointer(type_id, type_def)
+        elif type_def.metatype in {3, 4}:  # Array or Inline Array
+            return self._compile_array(type_id, type_def)
+        elif type_def.metatype == 7:  # BitField
+            return self._compile_bitfield(type_id, type_def)
+        elif type_def.metatype == 8:  # Enumeration
+            return self._compile_enumeration(type_id, type_def)
+        elif type_def.metatype == 9:  # String Hash
+            return self._compile_string_hash(type_id, type_def)
+        else:
+            return self._compile_error(Exception, 'Unknown Typedef Type {}'.format(type_def.metatype))
+
+    @staticmethod
+    def _compile_error(ex_type, arg):
+        def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+            raise ex_type(arg)
+        return f
+
+    def _compile_interpreted(self, type_id):
+        map_typedef = self.map_typedef
+        map_string_hash = self.map_string_hash
+        found_strings = self.found_strings
+
+        def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+            return read_instance(
+                buffer, n_buffer, buffer_pos, type_id, map_typedef, map_string_hash, abs_offset,
+                bit_offset=bit_offset, found_strings=found_strings)
+        return f
+
+    @staticmethod
+    def _compile_primitive(type_id):
+        read_one = prim_read_one[type_id]
+
+        def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+            v, new_pos = read_one(buffer, n_buffer, buffer_pos)
+            return AdfValue(v, type_id, buffer_pos + abs_offset), new_pos
+        return f
+
+    def _compile_string(self, type_id):
+        found_strings = self.found_strings
+
+        def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+            offset, opos = ff_read_u32(buffer, n_buffer, buffer_pos)
+            length, opos = ff_read_u32(buffer, n_buffer, opos)
+            v, _ = ff_read_strz(buffer, n_buffer, offset)
+            if found_strings is not None:
+                found_strings.add(v)
+            return AdfValue(v, type_id, buffer_pos + abs_offset, offset + abs_offset), opos
+        return f
+
+    def _compile_deferred(self, type_id):
+        reader = self.reader
+
+        def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+            v0, opos = ff_read_u32s(buffer, n_buffer, buffer_pos, 4)
+            if v0[0] == 0 or v0[2] == 0:
+                return None, opos
+            try:
+                v, _ = reader(v0[2])(buffer, n_buffer, v0[0], abs_offset)
+            except EDecaMissingAdfType as e:
+                v = f"!!!MISSING TYPE:  0x{e.type_id:08x} in 0x{v0[2]:08x}[{v0[1]}]"
+            return AdfValue(v, type_id, buffer_pos + abs_offset, v0[0] + abs_offset), opos
+        return f
+
+    def _compile_structure(self, type_id, type_def):
+        size = type_def.size
+
+        if self.lazy:
+            lazy_plan = {}
+            for m in type_def.members:
+                lazy_plan[m.name_utf8] = (m.offset, self.reader(m.type_hash), m.bit_offset)
+
+            def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+                v = AdfLazyStructure(lazy_plan, buffer, n_buffer, buffer_pos, abs_offset)
+                return AdfValue(v, type_id, buffer_pos + abs_offset), buffer_pos + size
+            return f
+
+        # primitive members are unpacked together with one struct call when their layout allows it
+        prim_members = sorted(
+            [m for m in type_def.members if m.type_hash in prim_struct_formats], key=lambda m: m.offset)
+        fmt = '<'
+        prim_end = 0
+        prim_index = {}
+        for m in prim_members:
+            if m.offset < prim_end:
+                prim_members = []
+                prim_index = {}
+                break
+            fmt = fmt + 'x' * (m.offset - prim_end) + prim_struct_formats[m.type_hash][0]
+            prim_end = m.offset + struct.calcsize('<' + prim_struct_formats[m.type_hash][0])
+            prim_index[id(m)] = len(prim_index)
+        unpack_from = struct.Struct(fmt).unpack_from
+
+        plan = []
+        for m in type_def.members:
+            if id(m) in prim_index:
+                plan.append((m.name_utf8, m.offset, None, prim_index[id(m)], prim_struct_formats[m.type_hash][1], m.type_hash))
+            else:
+                plan.append((m.name_utf8, m.offset, self.reader(m.type_hash), m.bit_offset, None, None))
+
+        def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+            if prim_end:
+                if buffer_pos + prim_end > n_buffer:
+                    raise_error()
+                prims = unpack_from(buffer, buffer_pos)
+            v = {}
+            for nm, m_offset, m_reader, m_arg, m_ctor, m_type in plan:
+                if m_reader is None:
+                    v[nm] = AdfValue(m_ctor(prims[m_arg]), m_type, buffer_pos + m_offset + abs_offset)
+                else:
+                    v[nm], _ = m_reader(buffer, n_buffer, buffer_pos + m_offset, abs_offset, m_arg)
+            return AdfValue(v, type_id, buffer_pos + abs_offset), buffer_pos + size
+        return f
+
+    @staticmethod
+    def _compile_pointer(type_id, type_def):
+        name = type_def.name
+        element_type_hash = type_def.element_type_hash
+
+        def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+            v0, buffer_pos = ff_read_u64(buffer, n_buffer, buffer_pos)
+            return (v0, 'NOTE: {}: {:016x} to {:08x}'.format(name, v0, element_type_hash)), buffer_pos
+        return f
+
+    def _compile_array(self, type_id, type_def):
+        inline = type_def.metatype == 4
+        element_length = type_def.element_length
+        element_type_hash = type_def.element_type_hash
+        read_many = prim_read_many.get(element_type_hash)
+        element_reader = None
+        element_dtype = None
+        element_members = None
+        element_stride = None
+        if read_many is None:
+            element_def = self.map_typedef.get(element_type_hash)
+            if self.struct_arrays and element_def is not None:
+                element_dtype = adf_struct_dtype(element_def)
+                element_members = [(m.name_utf8, m.type_hash, m.offset) for m in element_def.members]
+            if element_dtype is None:
+                element_reader = self.reader(element_type_hash)
+                if self.lazy and element_def is not None and element_def.metatype == MetaType.Structure:
+                    element_stride = element_def.size
+
+        def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+            if inline:
+                opos = None
+                offset = buffer_pos
+                length = element_length
+            else:
+                v0, opos = ff_read_u32s(buffer, n_buffer, buffer_pos, 3)
+                offset = v0[0]
+                length = v0[2]
+
+            if read_many is not None:
+                v, end_pos = read_many(buffer, n_buffer, offset, length)
+            elif element_dtype is not None:
+                end_pos = offset + element_dtype.itemsize * length
+                if end_pos > n_buffer:
+                    raise_error()
+                records = np.frombuffer(buffer, dtype=element_dtype, count=length, offset=offset) \
+                    if length > 0 else np.empty(0, dtype=element_dtype)
+                v = AdfStructArray(records, element_type_hash, element_members, offset + abs_offset)
+            elif element_stride is not None:
+                v = AdfLazyArray(element_reader, buffer, n_buffer, offset, length, element_stride, abs_offset)
+                end_pos = offset + element_stride * length
+            else:
+                v = [None] * length
+                end_pos = offset
+                for i in range(length):
+                    v[i], end_pos = element_reader(buffer, n_buffer, end_pos, abs_offset)
+
+            if opos is None:
+                opos = end_pos
+            return AdfValue(v, type_id, buffer_pos + abs_offset, offset + abs_offset), opos
+        return f
+
+    @staticmethod
+    def _compile_bitfield(type_id, type_def):
+        read_one = {1: ff_read_u8, 2: ff_read_u16, 4: ff_read_u32, 8: ff_read_u64}.get(type_def.size)
+        if read_one is None:
+            return AdfReaderCompiler._compile_error(Exception, 'Unknown bitfield size')
+
+        def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+            v, new_pos = read_one(buffer, n_buffer, buffer_pos)
+            if bit_offset is None:
+                bit_offset = 0
+                print('Missing bit offset')
+            v = (v >> bit_offset) & 1
+            return AdfValue(v, type_id, buffer_pos + abs_offset, bit_offset=bit_offset), new_pos
+        return f
+
+    @staticmethod
+    def _compile_enumeration(type_id, type_def):
+        if type_def.size != 4:
+            return AdfReaderCompiler._compile_error(Exception, 'Unknown enum size')
+        enum_names = [m.name for m in type_def.members]
+        n_enum_names = len(enum_names)
+
+        def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+            v, new_pos = ff_read_u32(buffer, n_buffer, buffer_pos)
+            vs = enum_names[v] if v < n_enum_names else None
+            return AdfValue(v, type_id, buffer_pos + abs_offset, enum_string=vs), new_pos
+        return f
+
+    def _compile_string_hash(self, type_id, type_def):
+        map_string_hash = self.map_string_hash
+        size = type_def.size
+
+        def lookup(v):
+            if v in map_string_hash:
+                return map_string_hash[v].value
+            return None
+
+        if size == 4:
+            def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+                v, new_pos = ff_read_u32(buffer, n_buffer, buffer_pos)
+                return AdfValue(v, type_id, buffer_pos + abs_offset, hash_string=lookup(v)), new_pos
+        elif size == 6:
+            def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+                v0, new_pos = ff_read_u16(buffer, n_buffer, buffer_pos)
+                v1, new_pos = ff_read_u16(buffer, n_buffer, new_pos)
+                v2, new_pos = ff_read_u16(buffer, n_buffer, new_pos)
+                v = v0 << 32 | v1 << 16 | v2
+                return AdfValue(v, type_id, buffer_pos + abs_offset, hash_string=lookup(v)), new_pos
+        elif size == 8:
+            def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+                v, new_pos = ff_read_u64(buffer, n_buffer, buffer_pos)
+                return AdfValue(v, type_id, buffer_pos + abs_offset, hash_string=lookup(v)), new_pos
+        else:
+            def f(buffer, n_buffer, buffer_pos, abs_offset, bit_offset=None):
+                v, new_pos = ff_read(buffer, n_buffer, buffer_pos, size)
+                return AdfValue(v, type_id, buffer_pos + abs_offset, hash_string=None), new_pos
+        return f
+
+
 class Adf:
     def __init__(self):
         self.version = None
@@ -768,65 +1241,78 @@ class Adf:
         self.table_instance_values = []
 
     def dump_to_string(self):
-        sbuf = ''
-        sbuf = sbuf + '--------header\n'
-        sbuf = sbuf + '{}: {}\n'.format('version', self.version)
-        sbuf = sbuf + '{}: {}\n'.format('instance_count', self.instance_count)
-        sbuf = sbuf + '{}: {}\n'.format('instance_offset', self.instance_offset)
-        sbuf = sbuf + '{}: {}\n'.format('typedef_count', self.typedef_count)
-        sbuf = sbuf + '{}: {}\n'.format('typedef_offset', self.typedef_offset)
-        sbuf = sbuf + '{}: {}\n'.format('stringhash_count', self.stringhash_count)
-        sbuf = sbuf + '{}: {}\n'.format('stringhash_offset', self.stringhash_offset)
-        sbuf = sbuf + '{}: {}\n'.format('nametable_count', self.nametable_count)
-        sbuf = sbuf + '{}: {}\n'.format('nametable_offset', self.nametable_offset)
-        sbuf = sbuf + '{}: {}\n'.format('total_size', self.total_size)
+        f = io.StringIO()
+        self.dump_to(f)
+        return f.getvalue()
+
+    def dump_to(self, f):
+        f.write('--------header\n')
+        f.write('{}: {}\n'.format('version', self.version))
+        f.write('{}: {}\n'.format('instance_count', self.instance_count))
+        f.write('{}: {}\n'.format('instance_offset', self.instance_offset))
+        f.write('{}: {}\n'.format('typedef_count', self.typedef_count))
+        f.write('{}: {}\n'.format('typedef_offset', self.typedef_offset))
+        f.write('{}: {}\n'.format('stringhash_count', self.stringhash_count))
+        f.write('{}: {}\n'.format('stringhash_offset', self.stringhash_offset))
+        f.write('{}: {}\n'.format('nametable_count', self.nametable_count))
+        f.write('{}: {}\n'.format('nametable_offset', self.nametable_offset))
+        f.write('{}: {}\n'.format('total_size', self.total_size))
         for i in range(len(self.unknown)):
-            sbuf = sbuf + 'Unknown[{0}]: {1} 0x{1:08x}\n'.format(i, self.unknown[i])
+            f.write('Unknown[{0}]: {1} 0x{1:08x}\n'.format(i, self.unknown[i]))
 
-        sbuf = sbuf + '\n--------comment\n'
-        sbuf = sbuf + self.comment.decode('utf-8')
+        f.write('\n--------comment\n')
+        f.write(self.comment.decode('utf-8'))
 
-        sbuf = sbuf + '\n\n--------name_table\n'
+        f.write('\n\n--------name_table\n')
         # sbuf = sbuf + '  NOT CURRENTLY SHOWN\n'
         for i in range(len(self.table_name)):
-            sbuf = sbuf + 'name_table\t{}\t{}\n'.format(i, self.table_name[i][1].decode('utf-8'))
+            f.write('name_table\t{}\t{}\n'.format(i, self.table_name[i][1].decode('utf-8')))
 
-        sbuf = sbuf + '\n--------string_hash\n'
+        f.write('\n--------string_hash\n')
         # sbuf = sbuf + '  NOT CURRENTLY SHOWN\n'
         v: StringHash
         for k, v in self.map_stringhash.items():
-            sbuf = sbuf + 'string_hash\t{:016x}\t{}\n'.format(k, v.value)
+            f.write('string_hash\t{:016x}\t{}\n'.format(k, v.value))
 
-        sbuf = sbuf + '\n--------typedefs\n'
+        f.write('\n--------typedefs\n')
         # sbuf = sbuf + '  NOT CURRENTLY SHOWN\n'
         vt: TypeDef
         for k, vt in self.map_typedef.items():
-            sbuf = sbuf + 'typedefs\t{:08x}\t{} @ {} (0x{:08x})\n'.format(
-                k, vt.name.decode('utf-8'), vt.META_position, vt.META_position)
-            sbuf = sbuf + dump_type(k, self.extended_map_typedef, 2)
+            f.write('typedefs\t{:08x}\t{} @ {} (0x{:08x})\n'.format(
+                k, vt.name.decode('utf-8'), vt.META_position, vt.META_position))
+            f.write(dump_type(k, self.extended_map_typedef, 2))
 
-        sbuf = sbuf + '\n--------instances\n'
+        f.write('\n--------instances\n')
         for info, v, fv in zip(self.table_instance, self.table_instance_values, self.table_instance_full_values):
             end_str = '{:08x}-???'.format(info.offset)
             if info.size is not None:
                 end_str = '{:08x}-{:08x}'.format(info.offset, info.offset + info.size)
 
-            sbuf = sbuf + 'instances\t{:08x}\t{:08x}\t{}\t{}\t{}\t{}\n'.format(
+            f.write('instances\t{:08x}\t{:08x}\t{}\t{}\t{}\t{}\n'.format(
                 info.name_hash,
                 info.type_hash,
                 info.name.decode('utf-8'),
                 info.offset, info.size,
-                end_str)
+                end_str))
 
             # sbuf = sbuf + pformat(v, width=1024) + '\n'
-            sbuf = sbuf + adf_format(fv, self.extended_map_typedef) + '\n'
+            adf_format_to(f, fv, self.extended_map_typedef)
+            f.write('\n')
 
-        return sbuf
+    def extract_instance_values(self):
+        for i, v in enumerate(self.table_instance_full_values):
+            if self.table_instance_values[i] is None and v is not None:
+                self.table_instance_values[i] = adf_value_extract(v)
+        return self.table_instance_values
 
-    def deserialize(self, fp, map_typedef=None, process_instances=True):
+    def deserialize(
+            self, fp, map_typedef=None, process_instances=True, engine=adf_engine_interpreted, extract_values=True):
         if map_typedef is None:
             map_typedef = {}
 
+        if engine not in {adf_engine_interpreted, adf_engine_compiled, adf_engine_numpy, adf_engine_lazy}:
+            raise Exception('Unknown ADF engine {}'.format(engine))
+
         header = fp.read(0x40)
 
         fh = ArchiveFile(io.BytesIO(header))
@@ -901,15 +1387,24 @@ class Adf:
         self.table_instance_values = [None] * len(self.table_instance)
         self.table_instance_full_values = [None] * len(self.table_instance)
         if process_instances:
+            compiler = None
+            if engine in {adf_engine_compiled, adf_engine_numpy, adf_engine_lazy}:
+                compiler = AdfReaderCompiler(
+                    self.extended_map_typedef, self.map_stringhash, self.found_strings,
+                    struct_arrays=engine in {adf_engine_numpy, adf_engine_lazy}, lazy=engine == adf_engine_lazy)
             for i in range(len(self.table_instance)):
                 ins = self.table_instance[i]
                 fp.seek(ins.offset)
                 buffer = fp.read(ins.size)
                 n_buffer = len(buffer)
                 buffer_pos = 0
-                v, buffer_pos = read_instance(
-                    buffer, n_buffer, buffer_pos,
-                    ins.type_hash, self.extended_map_typedef, self.map_stringhash, ins.offset,
-                    found_strings=self.found_strings)
+                if compiler is not None:
+                    v, buffer_pos = compiler.reader(ins.type_hash)(buffer, n_buffer, buffer_pos, ins.offset)
+                else:
+                    v, buffer_pos = read_instance(
+                        buffer, n_buffer, buffer_pos,
+                        ins.type_hash, self.extended_map_typedef, self.map_stringhash, ins.offset,
+                        found_strings=self.found_strings)
                 self.table_instance_full_values[i] = v
-                self.table_instance_values[i] = adf_value_extract(v)
+                if extract_values:
+                    self.table_instance_values[i] = adf_value_extract(v)